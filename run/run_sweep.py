@@ -0,0 +1,44 @@
+from turtleWorld.BarrioTortugaSEIR import BarrioTortugaSEIR
+from turtleWorld.BarrioTortugaArray import BarrioTortugaSEIRArray
+from turtleWorld.sweep import design, run_sweep
+import os
+
+
+def sweep_turtles(ranges,
+                  kind           = 'lhs',   # grid, lhs or sobol
+                  points         = 16,      # lhs and sobol only
+                  ns             = 10,
+                  steps          = 500,
+                  path           = "/Users/jjgomezcadenas/Projects/Development/turtleWorld/data",
+                  engine         = 'array', # mesa: agents, array: BarrioTortugaSEIRArray
+                  seed           = None,
+                  workers        = None,    # processes, all the cores by default
+                  cache          = None,    # turtleWorld.cache.RunCache
+                  **fixed):                 # parameters not swept
+
+    Barrio = BarrioTortugaSEIRArray if engine == 'array' else BarrioTortugaSEIR
+    pts    = design(ranges, kind, points, seed)
+    table  = run_sweep(Barrio, pts, ns, steps, fixed, seed, workers, cache=cache)
+
+    file = f'Sweep_{kind}_{"_".join(ranges)}_ns_{ns}_steps_{steps}.csv'
+    mfile = os.path.join(path, file)
+    table.to_csv(mfile, sep=" ")
+    print(f" Sweep of {len(pts)} points written to {mfile}")
+    return table
+
+
+if __name__ == '__main__':   # the workers of the sweep import this module
+    sweep_turtles({'r0'      : (2.0, 4.5),
+                   'ti'      : (3.0, 8.0),
+                   'tr'      : (3.0, 8.0),
+                   'p_dist'  : ['F', 'S', 'P'],
+                   'turtles' : (2000, 20000, int)},
+                  kind           = 'lhs',
+                  points         = 32,
+                  ns             = 10,
+                  steps          = 500,
+                  path           = "/Users/jjgomezcadenas/Projects/Development/turtleWorld/data",
+                  ticks_per_day  = 5,
+                  i0             = 10,
+                  width          = 40,
+                  height         = 40)
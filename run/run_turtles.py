@@ -1,5 +1,11 @@
 from scipy.stats import gamma
 from turtleWorld.BarrioTortugaSEIR import BarrioTortugaSEIR
+from turtleWorld.BarrioTortugaArray import BarrioTortugaSEIRArray
+from turtleWorld.utils import fill_to_steps
+from turtleWorld.store import EnsembleStore, is_store
+from turtleWorld.aggregate import EnsembleAggregator
+from turtleWorld.ensemble import run_ensemble, run_adaptive, cached_replicas
+from turtleWorld.cache import run_key
 import pandas as pd
 import os
 import sys
@@ -19,32 +25,55 @@ def run_turtles(steps          = 500,
                 tr_dist        = 'F',
                 p_dist         = 'F',    # F for fixed, S for Binomial, P for Poissoin
                 width          = 40,
-                height         = 40):
+                height         = 40,
+                engine         = 'mesa',  # mesa: agents, array: BarrioTortugaSEIRArray
+                seed           = None,    # None, int or numpy SeedSequence
+                cache          = None):   # turtleWorld.cache.RunCache
+
+    if engine == 'array':
+        Barrio = BarrioTortugaSEIRArray
+    else:
+        Barrio = BarrioTortugaSEIR
+    params = dict(ticks_per_day=ticks_per_day, turtles=turtles, i0=i0, r0=r0,
+                  ti=ti, tr=tr, ti_dist=ti_dist, tr_dist=tr_dist, p_dist=p_dist,
+                  width=width, height=height)
+
+    key = run_key(Barrio, params, steps, seed) if cache is not None else None
+    hit = cache.get(key) if key is not None else None
+    if hit is not None:
+        print(f" Simulation with {turtles}  turtles, for {steps} steps found in cache.")
+        return hit
 
     print(f" Running Simulation with {turtles}  turtles, for {steps} steps.")
-    bt = BarrioTortugaSEIR(ticks_per_day, turtles, i0, r0, ti, tr,
-                           ti_dist, tr_dist, p_dist,
-                           width, height)
+    bt = Barrio(seed=seed, **params)
 
     for i in range(steps):
         if i%fprint == 0:
             print(f' step {i}')
         bt.step()
+        if not bt.running:
+            print(f' no exposed or infected turtles left at step {i}')
+            break
     print('Done!')
 
     STATS = {}
     STATS['Ti'] = bt.Ti
     STATS['Tr'] = bt.Tr
     STATS['P']  = bt.P
-    return bt.datacollector.get_model_vars_dataframe(), pd.DataFrame.from_dict(STATS)
+    dft = fill_to_steps(bt.datacollector.get_model_vars_dataframe(), steps,
+                        bt.datacollector.every)
+    stats = pd.DataFrame.from_dict(STATS)
+    if key is not None:
+        cache.put(key, dft, stats)
+    return dft, stats
 
 
 
 def run_series(ns=100,
-               csv            = False,
+               csv            = False,  # one space separated file per replica
                path           ="/Users/jjgomezcadenas/Projects/Development/turtleWorld/data",
                steps          = 500,
-               fprint         = 25,
+               fprint         = 25,     # not used: the replicas run in a pool of processes
                ticks_per_day  = 5,
                turtles        = 10000,
                i0             = 10,
@@ -55,14 +84,25 @@ def run_series(ns=100,
                tr_dist        = 'F',
                p_dist         = 'F',    # F for fixed, S for Binomial, P for Poissoin
                width          = 40,
-               height         = 40):
-
-    if csv:
+               height         = 40,
+               store          = False,  # columnar store (see turtleWorld.store)
+               engine         = 'mesa',
+               seed           = None,   # seed of the ensemble
+               workers        = None,   # processes, all the cores by default
+               cache          = None,   # turtleWorld.cache.RunCache
+               tolerances     = None,   # adaptive: dict output -> CI half width, ns is the maximum
+               min_ns         = 10):    # adaptive: minimum number of replicas
+
+    if csv or store:
         fn1 = f'Turtles_{turtles}_steps_{steps}_i0_{i0}_r0_{r0}_ti_{ti}_tr_{tr}'
         fn2 = f'Tid_{ti_dist}_Tir_{tr_dist}_Pdist_{p_dist}'
         dirname =f'{fn1}_{fn2}'
         mdir = os.path.join(path, dirname)
 
+    if (csv or store) and cache is not None:  # keep the files of the cached replicas
+        os.makedirs(mdir, exist_ok=True)
+        print(f"Directory {mdir} kept")
+    elif csv or store:
         try:
             shutil.rmtree(mdir, ignore_errors=False, onerror=None)
             print(f"Directory {mdir} has been removed" )
@@ -80,58 +120,67 @@ def run_series(ns=100,
             sys.exit()
 
 
-    STATS = []
-    DFT   = []
-    for i in range(ns):
-        print(f' series number {i}')
-        dft, stats = run_turtles(steps, fprint, ticks_per_day, turtles, i0, r0,
-                                 ti, tr,
-                                 ti_dist, tr_dist, p_dist,
-                                 width, height)
-
-        STATS.append(stats)
-        DFT.append(dft)
+    if engine == 'array':
+        Barrio = BarrioTortugaSEIRArray
+    else:
+        Barrio = BarrioTortugaSEIR
+    params = dict(ticks_per_day=ticks_per_day, turtles=turtles, i0=i0, r0=r0,
+                  ti=ti, tr=tr, ti_dist=ti_dist, tr_dist=tr_dist, p_dist=p_dist,
+                  width=width, height=height)
+
+    if store and cache is not None and is_store(mdir):
+        ens = EnsembleStore(mdir, mode='r+')
+        if (ens.ns, ens.steps, ens.meta['turtles']) != (ns, steps, turtles):
+            ens = EnsembleStore.create(mdir, ns, steps, turtles, meta=params)
+    elif store:
+        ens = EnsembleStore.create(mdir, ns, steps, turtles, meta=params)
+
+    agg = EnsembleAggregator()    # mean, std, min, max and quantiles per tick
+    cached = cached_replicas(Barrio, ns, steps, params, seed, cache)  # their files are kept
+    if tolerances is None:
+        replicas = run_ensemble(Barrio, ns, steps, params, seed, workers, cache=cache)
+    else:
+        replicas = run_adaptive(Barrio, tolerances, params, steps, seed, workers,
+                                min_ns=min_ns, max_ns=ns, cache=cache)
+    for i, dft, stats in replicas:
+        agg.add(dft)
+        if store and not (i in cached and ens.written[i]):
+            ens.write(i, dft, stats)
         if csv:
             file =f'DFT_run_{i}.csv'
             mfile = os.path.join(mdir, file)
-            dft.to_csv(mfile, sep=" ")
+            if i not in cached or not os.path.isfile(mfile):
+                dft.to_csv(mfile, sep=" ")
             if i == 0:
                 file=f'STA.csv'
                 mfile = os.path.join(mdir, file)
-                stats.to_csv(mfile, sep=" ")
+                if i not in cached or not os.path.isfile(mfile):
+                    stats.to_csv(mfile, sep=" ")
 
-    df  = pd.concat(DFT)
-    dfs = pd.concat(STATS)
+    if store:
+        ens.flush()
 
     if csv:
-
-        # for i in range(len(DFT)):
-        #     file =f'DFT_run_{i}.csv'
-        #     mfile = os.path.join(mdir, file)
-        #     DFT[i].to_csv(mfile, sep=" ")
-
         file=f'DFT_run_average.csv'
         mfile = os.path.join(mdir, file)
-        df.groupby(df.index).mean().to_csv(mfile, sep=" ")
-
-        # file=f'STA.csv'
-        # mfile = os.path.join(mdir, file)
-        # STATS[0].to_csv(mfile, sep=" ")
-        #dfs.groupby(dfs.index).mean().to_csv(mfile, sep=" ")
-
-run_series(ns             = 2,
-           csv            = True,
-           path           ="/Users/jjgomezcadenas/Projects/Development/turtleWorld/data",
-           steps          = 500,
-           fprint         = 25,
-           ticks_per_day  = 5,
-           turtles        = 1000,
-           i0             = 10,
-           r0             = 3.5,
-           ti             = 5.5,
-           tr             = 6.5,
-           ti_dist        = 'F',    # F for fixed, E for exp G for Gamma
-           tr_dist        = 'F',
-           p_dist         = 'F',    # F for fixed, S for Binomial, P for Poissoin
-           width          = 40,
-           height         = 40)
+        agg.mean().to_csv(mfile, sep=" ")
+
+    return agg
+
+
+if __name__ == '__main__':   # the workers of the ensemble import this module
+    run_series(ns             = 2,
+               store          = True,
+               path           ="/Users/jjgomezcadenas/Projects/Development/turtleWorld/data",
+               steps          = 500,
+               ticks_per_day  = 5,
+               turtles        = 1000,
+               i0             = 10,
+               r0             = 3.5,
+               ti             = 5.5,
+               tr             = 6.5,
+               ti_dist        = 'F',    # F for fixed, E for exp G for Gamma
+               tr_dist        = 'F',
+               p_dist         = 'F',    # F for fixed, S for Binomial, P for Poissoin
+               width          = 40,
+               height         = 40)
@@ -1,11 +1,17 @@
 from scipy.stats import gamma
 from turtleWorld.BarrioTortugaSEIR import BarrioTortugaNX
 from turtleWorld.networks import build_ed_network, build_ba_network
+from turtleWorld.utils import fill_to_steps
+from turtleWorld.store import EnsembleStore, is_store
+from turtleWorld.aggregate import EnsembleAggregator
+from turtleWorld.ensemble import run_ensemble, run_adaptive, cached_replicas, nx_model, shared_network
+from turtleWorld.cache import run_key
 import pandas as pd
 import networkx as nx
 import os
 import sys
 import shutil
+from contextlib import nullcontext
 
 #turtles        = 20000
 #k              = 0.002
@@ -31,41 +37,59 @@ def run_turtles(turtles        = 20000,
                 ti_dist        = 'F',    # F for fixed, E for exp G for Gamma
                 tr_dist        = 'F',
                 p_dist         = 'F',    # F for fixed, S for Binomial, P for Poissoin
-                network        = 'ER'   # ER = random netwok BA: preferential attachment
+                network        = 'ER',  # ER = random netwok BA: preferential attachment
+                engine         = 'mesa',# mesa: agents, array: BarrioTortugaNXArray
+                graph_seed     = None,  # fixed graph for all the replicas (shared memory)
+                graph_cache    = None,  # directory of the graph cache (turtleWorld.cache.GraphCache)
+                seed           = None,  # None, int or numpy SeedSequence
+                cache          = None   # turtleWorld.cache.RunCache
                 ):
 
+    params = dict(turtles=turtles, k=k, network=network, engine=engine,
+                  graph_seed=graph_seed, graph_cache=graph_cache,
+                  ticks_per_day=ticks_per_day, i0=i0, r0=r0, ti=ti, tr=tr,
+                  ti_dist=ti_dist, tr_dist=tr_dist, p_dist=p_dist)
+
+    key = run_key(nx_model, params, steps, seed) if cache is not None else None
+    hit = cache.get(key) if key is not None else None
+    if hit is not None:
+        print(f' Simulation with netwok {network} for {steps} steps found in cache.')
+        return hit
 
     print(f'Defining network for {turtles} turtles, k = {k}')
 
-    if network == 'ER':
-        G, n           = build_ed_network(turtles, k)
-    else:
-        G, n           = build_ba_network(turtles, k)
+    bt = nx_model(seed=seed, **params)
 
     print(f" Running Simulation with netwok {network}   for {steps} steps.")
-    bt = BarrioTortugaNX(G, n, ticks_per_day, i0, r0, ti, tr,
-                         ti_dist, tr_dist, p_dist)
 
     for i in range(steps):
         if i%fprint == 0:
             print(f' step {i}')
         bt.step()
+        if not bt.running:
+            print(f' no exposed or infected turtles left at step {i}')
+            break
     print('Done!')
 
     STATS = {}
     STATS['Ti'] = bt.Ti
     STATS['Tr'] = bt.Tr
     STATS['P']  = bt.P
-    return bt.datacollector.get_model_vars_dataframe(), pd.DataFrame.from_dict(STATS)
+    dft = fill_to_steps(bt.datacollector.get_model_vars_dataframe(), steps,
+                        bt.datacollector.every)
+    stats = pd.DataFrame.from_dict(STATS)
+    if key is not None:
+        cache.put(key, dft, stats)
+    return dft, stats
 
 
 def run_series(ns=100,
-               csv            = False,
+               csv            = False,  # one space separated file per replica
                path           ="/Users/jjgomezcadenas/Projects/Development/turtleWorld/data",
                turtles        = 20000,
                k              = 0.002,
                steps          = 500,
-               fprint         = 25,
+               fprint         = 25,    # not used: the replicas run in a pool of processes
                ticks_per_day  = 5,
                i0             = 20,
                r0             = 3.5,
@@ -74,15 +98,28 @@ def run_series(ns=100,
                ti_dist        = 'F',    # F for fixed, E for exp G for Gamma
                tr_dist        = 'F',
                p_dist         = 'F',    # F for fixed, S for Binomial, P for Poissoin
-               network        = 'ER'   # F for fixed, S for Binomial, P for Poissoin
+               network        = 'ER',  # ER = random netwok BA: preferential attachment
+               store          = False, # columnar store (see turtleWorld.store)
+               engine         = 'mesa',# mesa: agents, array: BarrioTortugaNXArray
+               graph_seed     = None,  # fixed graph for all the replicas (shared memory)
+               graph_cache    = None,  # directory of the graph cache (turtleWorld.cache.GraphCache)
+               seed           = None,  # seed of the ensemble
+               workers        = None,  # processes, all the cores by default
+               cache          = None,  # turtleWorld.cache.RunCache
+               tolerances     = None,  # adaptive: dict output -> CI half width, ns is the maximum
+               min_ns         = 10     # adaptive: minimum number of replicas
                ):
 
-    if csv:
+    if csv or store:
         fn1 = f'Nx_{network}_Turtles_{turtles}_steps_{steps}_i0_{i0}_r0_{r0}_ti_{ti}_tr_{tr}'
         fn2 = f'Tid_{ti_dist}_Tir_{tr_dist}_Pdist_{p_dist}'
         dirname =f'{fn1}_{fn2}'
         mdir = os.path.join(path, dirname)
 
+    if (csv or store) and cache is not None:  # keep the files of the cached replicas
+        os.makedirs(mdir, exist_ok=True)
+        print(f"Directory {mdir} kept")
+    elif csv or store:
         try:
             shutil.rmtree(mdir, ignore_errors=False, onerror=None)
             print(f"Directory {mdir} has been removed" )
@@ -100,48 +137,72 @@ def run_series(ns=100,
             sys.exit()
 
 
-    STATS = []
-    DFT   = []
-    for i in range(ns):
-        print(f' series number {i}')
-        dft, stats = run_turtles(turtles, k, steps, fprint, ticks_per_day, i0, r0, ti, tr,
-                                 ti_dist, tr_dist, p_dist, network)
-
-        STATS.append(stats)
-        DFT.append(dft)
-        if csv:
-            file =f'DFT_run_{i}.csv'
-            mfile = os.path.join(mdir, file)
-            dft.to_csv(mfile, sep=" ")
-            if i == 0:
-                file=f'STA.csv'
+    params = dict(turtles=turtles, k=k, network=network, engine=engine,
+                  graph_seed=graph_seed, graph_cache=graph_cache,
+                  ticks_per_day=ticks_per_day, i0=i0, r0=r0, ti=ti, tr=tr,
+                  ti_dist=ti_dist, tr_dist=tr_dist, p_dist=p_dist)
+
+    if store and cache is not None and is_store(mdir):
+        ens = EnsembleStore(mdir, mode='r+')
+        if (ens.ns, ens.steps, ens.meta['turtles']) != (ns, steps, turtles):
+            ens = EnsembleStore.create(mdir, ns, steps, turtles, meta=params)
+    elif store:
+        ens = EnsembleStore.create(mdir, ns, steps, turtles, meta=params)
+
+    # a graph fixed for all the replicas is published once, in shared memory
+    shared = nullcontext()
+    if graph_seed is not None:
+        shared = shared_network(network, turtles, k, graph_seed, engine, graph_cache)
+
+    agg = EnsembleAggregator()    # mean, std, min, max and quantiles per tick
+    with shared as graph:
+        if graph is not None:
+            params = dict(params, graph=graph)
+        cached = cached_replicas(nx_model, ns, steps, params, seed, cache)  # their files are kept
+        if tolerances is None:
+            replicas = run_ensemble(nx_model, ns, steps, params, seed, workers, cache=cache)
+        else:
+            replicas = run_adaptive(nx_model, tolerances, params, steps, seed, workers,
+                                    min_ns=min_ns, max_ns=ns, cache=cache)
+        for i, dft, stats in replicas:
+            agg.add(dft)
+            if store and not (i in cached and ens.written[i]):
+                ens.write(i, dft, stats)
+            if csv:
+                file =f'DFT_run_{i}.csv'
                 mfile = os.path.join(mdir, file)
-                stats.to_csv(mfile, sep=" ")
+                if i not in cached or not os.path.isfile(mfile):
+                    dft.to_csv(mfile, sep=" ")
+                if i == 0:
+                    file=f'STA.csv'
+                    mfile = os.path.join(mdir, file)
+                    if i not in cached or not os.path.isfile(mfile):
+                        stats.to_csv(mfile, sep=" ")
 
-    df  = pd.concat(DFT)
-    dfs = pd.concat(STATS)
+    if store:
+        ens.flush()
 
     if csv:
-
         file=f'DFT_run_average.csv'
         mfile = os.path.join(mdir, file)
-        df.groupby(df.index).mean().to_csv(mfile, sep=" ")
-
-
-run_series(ns             = 1,
-           csv            = True,
-           path           ="/Users/jjgomezcadenas/Projects/Development/turtleWorld/data",
-           turtles        = 40000,
-           k              = 20,
-           steps          = 500,
-           fprint         = 25,
-           ticks_per_day  = 5,
-           i0             = 10,
-           r0             = 3.5,
-           ti             = 5.5,
-           tr             = 6.5,
-           ti_dist        = 'F',    # F for fixed, E for exp G for Gamma
-           tr_dist        = 'F',
-           p_dist         = 'F',    # F for fixed, S for Binomial, P for Poissoin
-           network        = 'BA'   # F for fixed, S for Binomial, P for Poissoin
-           )
+        agg.mean().to_csv(mfile, sep=" ")
+
+    return agg
+
+if __name__ == '__main__':   # the workers of the ensemble import this module
+    run_series(ns             = 1,
+               store          = True,
+               path           ="/Users/jjgomezcadenas/Projects/Development/turtleWorld/data",
+               turtles        = 40000,
+               k              = 20,
+               steps          = 500,
+               ticks_per_day  = 5,
+               i0             = 10,
+               r0             = 3.5,
+               ti             = 5.5,
+               tr             = 6.5,
+               ti_dist        = 'F',    # F for fixed, E for exp G for Gamma
+               tr_dist        = 'F',
+               p_dist         = 'F',    # F for fixed, S for Binomial, P for Poissoin
+               network        = 'BA'   # ER = random netwok BA: preferential attachment
+               )
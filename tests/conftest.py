@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import turtleWorld.BarrioTortugaSEIR as BarrioTortugaSEIR
+import turtleWorld.BarrioTortugaArray as BarrioTortugaArray
+from turtleWorld.utils import PrtLvl
+
+
+@pytest.fixture(autouse=True)
+def mute(monkeypatch):
+    """The models print nothing during the tests"""
+    monkeypatch.setattr(BarrioTortugaSEIR, 'prtl', PrtLvl.Mute)
+    monkeypatch.setattr(BarrioTortugaArray, 'prtl', PrtLvl.Mute)
+
+
+def run(model, steps):
+    """Runs model for steps and returns its data frame"""
+    for _ in range(steps):
+        model.step()
+    return model.datacollector.get_model_vars_dataframe()
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from turtleWorld.aggregate import P2Quantiles, EnsembleAggregator, QUANTILES
+
+
+def test_p2_as_np_quantile():
+    X = np.random.default_rng(0).gamma(2.0, 3.0, size=(2000, 20, 3))
+    p = P2Quantiles((20, 3))
+    for x in X:
+        p.add(x)
+    exact = np.quantile(X, QUANTILES, axis=0)
+
+    error = np.abs(p.quantiles() - exact) / exact
+    assert error.max() < 0.15 and error.mean() < 0.02
+
+
+def test_p2_exact_below_5():
+    X = np.random.default_rng(1).normal(size=(3, 4))
+    p = P2Quantiles((4,))
+    for x in X:
+        p.add(x)
+    assert np.allclose(p.quantiles(), np.quantile(X, QUANTILES, axis=0))
+
+
+def test_aggregator_moments():
+    X = np.random.default_rng(2).poisson(20, size=(50, 30, 4)).astype(float)
+    a = EnsembleAggregator(columns=list('abcd'))
+    for x in X:
+        a.add(pd.DataFrame(x, columns=list('abcd')))
+
+    assert np.allclose(a.mean().values, X.mean(axis=0))
+    assert np.allclose(a.std().values, X.std(axis=0, ddof=1))
+    assert np.array_equal(a.min().values, X.min(axis=0))
+    assert np.array_equal(a.max().values, X.max(axis=0))
@@ -0,0 +1,44 @@
+import pytest
+
+from turtleWorld.BarrioTortugaSEIR import BarrioTortugaSEIR, BarrioTortugaNX
+from turtleWorld.BarrioTortugaArray import BarrioTortugaSEIRArray
+from turtleWorld.networks import build_ba_network
+
+from conftest import run
+
+G = build_ba_network(1000, 4, seed=2)[0]
+
+MODELS = [lambda **kw: BarrioTortugaSEIR(turtles=1000, i0=10, ti_dist='E', p_dist='S', seed=1, **kw),
+          lambda **kw: BarrioTortugaSEIRArray(turtles=1000, i0=10, seed=1, **kw),
+          lambda **kw: BarrioTortugaNX(G, 8, i0=10, tr_dist='G', seed=1, **kw)]
+
+
+@pytest.mark.parametrize('make', MODELS)
+def test_checkpoint_round_trip(make, tmp_path):
+    ref = make()
+    run(ref, 100)
+
+    model = make()
+    run(model, 40)
+    model.save_checkpoint(tmp_path / 'ck.npz')
+    run(model, 20)                                   # past the checkpoint, discarded
+    back = type(model).load_checkpoint(tmp_path / 'ck.npz')
+    df   = run(back, 60)
+
+    assert df.equals(ref.datacollector.get_model_vars_dataframe())
+    assert back.counts == ref.counts
+
+
+def test_checkpoint_with_spill(tmp_path):
+    ref = BarrioTortugaSEIR(turtles=1000, i0=10, seed=1)
+    run(ref, 100)
+
+    model = BarrioTortugaSEIR(turtles=1000, i0=10, seed=1, spill=str(tmp_path / 'spill'))
+    dc    = model.datacollector                     # chunks of 16 rows
+    dc.values, dc.ticks = dc.values[:16].copy(), dc.ticks[:16].copy()
+    run(model, 40)
+    assert dc.chunks > 0
+    model.save_checkpoint(tmp_path / 'ck.npz')
+    back = BarrioTortugaSEIR.load_checkpoint(tmp_path / 'ck.npz')
+
+    assert run(back, 60).equals(ref.datacollector.get_model_vars_dataframe())
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+from mesa.visualization.modules import ChartModule
+
+from turtleWorld.BarrioTortugaSEIR import BarrioTortugaSEIR
+from turtleWorld.BarrioTortugaArray import BarrioTortugaSEIRArray
+from turtleWorld.ensemble import run_model
+
+from conftest import run
+
+SERIES = [{"Label": name, "Color": "Black"}
+          for name in ('NumberOfSusceptible', 'NumberOfExposed',
+                       'NumberOfInfected', 'NumberOfRecovered')]
+
+
+@pytest.mark.parametrize('Barrio', (BarrioTortugaSEIR, BarrioTortugaSEIRArray))
+def test_chart_renders(Barrio):
+    model = Barrio(turtles=500, i0=5, seed=1)
+    run(model, 5)
+    chart  = ChartModule(SERIES)
+    values = chart.render(model)
+
+    json.dumps(values)
+    assert values == [model.datacollector.model_vars[s['Label']][-1] for s in SERIES]
+    assert sum(values) == 500
+
+
+@pytest.mark.parametrize('Barrio', (BarrioTortugaSEIR, BarrioTortugaSEIRArray))
+def test_decimated_run_on_grid(Barrio):
+    full, every = run_model(Barrio(turtles=300, i0=2, width=15, height=15, seed=2), 400)[0], 7
+    model = Barrio(turtles=300, i0=2, width=15, height=15, seed=2, collect_every=every)
+    dft   = run_model(model, 400)[0]
+
+    assert model.schedule.steps < 400                       # the epidemic ended early
+    assert dft.index.tolist() == list(range(0, 401, every))
+    assert dft.equals(full.loc[dft.index])
+    assert dft.iloc[-1].tolist() == full.iloc[-1].tolist()
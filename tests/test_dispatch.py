@@ -0,0 +1,63 @@
+import os
+import time
+
+import numpy as np
+
+from turtleWorld.BarrioTortugaArray import BarrioTortugaSEIRArray
+from turtleWorld.ensemble import run_ensemble
+from turtleWorld.dispatch import (submit, start_workers, work, claim, collect, status,
+                                  read_json, spool_dir)
+
+PARAMS = dict(turtles=300, i0=2, width=15, height=15)
+
+
+def by_index(results):
+    return {index: dft.to_numpy() for index, dft, stats in results}
+
+
+def age(path, seconds):
+    """Makes the heartbeat of path seconds old, as that of a killed worker"""
+    t = time.time() - seconds
+    os.utime(path, (t, t))
+
+
+def test_workers_as_run_ensemble(tmp_path):
+    spool = str(tmp_path / 'spool')
+    assert submit(spool, BarrioTortugaSEIRArray, 6, 60, PARAMS, seed=3, unit_size=2) == 3
+    for w in start_workers(spool, 3, poll=0.1):
+        w.join()
+        assert w.exitcode == 0
+
+    ref  = by_index(run_ensemble(BarrioTortugaSEIRArray, 6, 60, PARAMS, seed=3, workers=1))
+    runs = by_index(collect(spool))
+    assert sorted(runs) == list(range(6))
+    assert all(np.array_equal(runs[i], ref[i]) for i in ref)
+    assert status(spool) == dict(todo=0, running=0, done=3, failed=0)
+
+
+def test_stale_unit_requeued(tmp_path):
+    spool = str(tmp_path / 'spool')
+    submit(spool, BarrioTortugaSEIRArray, 4, 60, PARAMS, seed=3)
+    path = claim(spool)                     # its worker dies before any heartbeat
+    age(path, 1000)
+
+    assert work(spool, stale=60, poll=0.1, quiet=False) == 4
+
+    unit = read_json(os.path.join(spool_dir(spool, 'done'), os.path.basename(path)))
+    assert unit['attempts'] == 1 and 'stale' in unit['errors'][0]
+    assert status(spool) == dict(todo=0, running=0, done=4, failed=0)
+
+    runs = [index for index, dft, stats in collect(spool)]
+    ref  = by_index(run_ensemble(BarrioTortugaSEIRArray, 4, 60, PARAMS, seed=3, workers=1))
+    assert sorted(runs) == list(range(4))   # the unit counted once
+    assert all(np.array_equal(by_index(collect(spool))[i], ref[i]) for i in ref)
+
+
+def test_retry_cap(tmp_path):
+    spool = str(tmp_path / 'spool')
+    submit(spool, BarrioTortugaSEIRArray, 2, 60, PARAMS, seed=3, max_attempts=1)
+    age(claim(spool), 1000)
+
+    assert work(spool, stale=60, poll=0.1, quiet=False) == 1
+    assert status(spool) == dict(todo=0, running=0, done=1, failed=1)
+    assert [index for index, dft, stats in collect(spool)] == [1]
@@ -0,0 +1,47 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from turtleWorld.networks import load_edge_list, graph_from_adjacency, NodeTable
+
+
+def edge_sets(G):
+    return set(map(frozenset, G.edges()))
+
+
+@pytest.mark.parametrize('chunk', (97, 2**20))
+def test_load_edge_list(chunk, tmp_path):
+    rng  = np.random.default_rng(0)
+    u, v = rng.integers(0, 300, (2, 3000)) * 7 + 1000          # sparse ids, loops, repeats
+    path = tmp_path / 'edges.txt'
+    with open(path, 'w') as f:
+        f.write('# a comment\n')
+        for a, b in zip(u, v):
+            f.write(f'{a}\t{b}  1.0\n')
+        f.write(f'{v[0]} {u[0]}\n')
+
+    nodes, indptr, indices = load_edge_list(path, chunk=chunk)
+    G = nx.Graph()
+    G.add_edges_from((a, b) for a, b in zip(u.tolist(), v.tolist()) if a != b)
+    H = graph_from_adjacency(nodes, indptr, indices)
+
+    assert set(H) == set(G) and edge_sets(H) == edge_sets(G)
+    assert all((np.diff(indices[indptr[i]:indptr[i + 1]]) > 0).all()
+               for i in range(len(indptr) - 1))
+
+
+def test_load_edge_list_strings(tmp_path):
+    path = tmp_path / 'edges.csv'
+    path.write_text('a,b\nx,y\ny,z\nz,x\nx,y\n')
+    nodes, indptr, indices = load_edge_list(path, delimiter=',', skiprows=1, dtype=str)
+
+    assert sorted(nodes) == ['x', 'y', 'z']
+    assert np.diff(indptr).tolist() == [2, 2, 2]
+
+
+def test_node_table():
+    table = NodeTable()
+    assert table.relabel(np.array([30, 10, 30, 20])).tolist() == [0, 1, 0, 2]
+    assert table.relabel(np.array([20, 40, 10, 50, 40])).tolist() == [2, 3, 1, 4, 3]
+    assert len(table) == 5
+    assert table.nodes().tolist() == [30, 10, 20, 40, 50]
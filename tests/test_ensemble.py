@@ -0,0 +1,54 @@
+import numpy as np
+
+from turtleWorld.BarrioTortugaArray import BarrioTortugaSEIRArray
+from turtleWorld import cache as cache_module, networks
+from turtleWorld.cache import RunCache, make_graph, network_from_arrays
+from turtleWorld.ensemble import run_ensemble, run_adaptive, cached_replicas, mute_models, nx_model
+
+PARAMS = dict(turtles=300, i0=2, width=15, height=15)
+TOL    = {'attack_rate': 0.2}
+
+
+class CountingCache(RunCache):
+    puts = 0
+
+    def put(self, key, dft, stats):
+        self.puts += 1
+        return super().put(key, dft, stats)
+
+
+def test_ensemble_cache(tmp_path):
+    cache = CountingCache(str(tmp_path))
+    assert cached_replicas(BarrioTortugaSEIRArray, 4, 60, PARAMS, 3, cache) == set()
+    runs  = [list(run_ensemble(BarrioTortugaSEIRArray, 4, 60, PARAMS, seed=3,
+                               workers=1, cache=cache)) for _ in range(2)]
+    assert cached_replicas(BarrioTortugaSEIRArray, 4, 60, PARAMS, 3, cache) == {0, 1, 2, 3}
+
+    assert cache.puts == 4
+    assert all(np.array_equal(a[1].to_numpy(), b[1].to_numpy()) for a, b in zip(*runs))
+
+
+def test_adaptive_puts_only_runs(tmp_path):
+    cache = CountingCache(str(tmp_path))
+    first = list(run_adaptive(BarrioTortugaSEIRArray, TOL, PARAMS, 60, seed=3, workers=1,
+                              min_ns=4, max_ns=20, cache=cache))
+    puts  = cache.puts
+    again = list(run_adaptive(BarrioTortugaSEIRArray, TOL, PARAMS, 60, seed=3, workers=1,
+                              min_ns=4, max_ns=20, cache=cache))
+
+    assert puts == len(first)
+    assert cache.puts == puts                     # all hits, nothing written again
+    assert [a[0] for a in first] == [b[0] for b in again]
+    assert all(np.array_equal(a[1].to_numpy(), b[1].to_numpy()) for a, b in zip(first, again))
+
+
+def test_mute_models(monkeypatch, capsys):
+    for module in (networks, cache_module):
+        monkeypatch.setattr(module, 'prtl', module.prtl)     # restored after the test
+    mute_models()
+    model = nx_model(300, 4, 'BA', seed=1, engine='array', i0=2)
+    nx_model(300, 0.02, 'ER', seed=1, i0=2)
+    network_from_arrays(make_graph('BA', 300, 4, 1))
+
+    assert model.counts[0] == 298
+    assert capsys.readouterr().out == ''
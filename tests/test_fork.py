@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from turtleWorld.BarrioTortugaSEIR import BarrioTortugaSEIR
+from turtleWorld.BarrioTortugaArray import BarrioTortugaSEIRArray
+
+from conftest import run
+
+ENGINES = (BarrioTortugaSEIR, BarrioTortugaSEIRArray)
+
+
+@pytest.mark.parametrize('Barrio', ENGINES)
+def test_fork_r0_rescales_p(Barrio):
+    base = Barrio(turtles=1000, i0=10, p_dist='S', seed=1)
+    run(base, 20)
+    r0, p, P = base.r0, base.p, np.array(base.P, dtype=float)
+
+    child, = base.fork([dict(r0=2 * r0)])
+
+    assert np.isscalar(child.r0) and np.isscalar(child.p)
+    assert child.r0 == pytest.approx(2 * r0)
+    assert child.p  == pytest.approx(2 * p)
+    assert np.allclose(child.P, 2 * P)
+    assert base.r0 == r0 and np.array_equal(base.P, P)
+
+
+@pytest.mark.parametrize('Barrio', ENGINES)
+def test_fork_p_rescales_r0(Barrio):
+    base = Barrio(turtles=1000, i0=10, seed=1)
+    run(base, 20)
+    child, = base.fork([dict(p=base.p / 2)])
+
+    assert np.isscalar(child.r0) and np.isscalar(child.p)
+    assert child.r0 == pytest.approx(base.r0 / 2)
+    assert np.allclose(child.P, np.array(base.P) / 2)
+
+
+@pytest.mark.parametrize('Barrio', ENGINES)
+def test_fork_shares_the_past(Barrio):
+    base  = Barrio(turtles=1000, i0=10, seed=1)
+    past  = run(base, 30)
+    kids  = base.fork(2)
+    again = base.fork(1)
+    dfs   = [run(kid, 30) for kid in kids + again]
+
+    assert all(df.iloc[:len(past)].equals(past) for df in dfs)
+    assert dfs[0].equals(dfs[2])          # the branches are reproducible
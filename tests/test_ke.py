@@ -0,0 +1,58 @@
+import numpy as np
+
+from turtleWorld.networks import (FenwickTree, ke_edges, ke_csr, KE_network_init,
+                                  KE_newtwork_step)
+from turtleWorld.rng import RandomStream, make_generator
+
+
+def test_fenwick_find():
+    w    = [3, 0, 2, 5, 0, 1, 0, 0, 4, 1]
+    tree = FenwickTree(len(w))
+    for i, x in enumerate(w):
+        tree.add(i, x)
+    cum  = np.cumsum(w)
+
+    assert tree.total == sum(w)
+    assert [tree.find(x) for x in range(sum(w))] == np.searchsorted(cum, range(sum(w)),
+                                                                    side='right').tolist()
+    tree.add(3, -5)
+    assert 3 not in [tree.find(x) for x in range(tree.total)]
+
+
+def test_fenwick_sampling():
+    rng  = np.random.default_rng(1)
+    w    = rng.integers(1, 20, 50)
+    tree = FenwickTree(len(w))
+    for i, x in enumerate(w):
+        tree.add(i, int(x))
+    draws = np.bincount([tree.find(int(x)) for x in rng.integers(0, tree.total, 50000)],
+                        minlength=len(w))
+
+    expected = 50000 * w / w.sum()
+    assert np.all(np.abs(draws - expected) < 5 * np.sqrt(expected))
+
+
+def test_ke_edges():
+    n, m     = 2000, 5
+    u, v, a  = ke_edges(n, m, 0.3, seed=9)
+    indptr, indices, D = ke_csr(n, m, 0.3, seed=9)
+
+    assert (u > v).all() and np.unique(u * n + v).size == len(u)
+    links = np.bincount(u, minlength=n)[m:]                  # of the nodes added
+    assert (links >= 1).all() and (links <= m).all() and links.mean() > m - 0.1
+    assert len(a) == m
+    assert (D >= 1).all() and D.sum() == 2 * len(u)
+    assert np.array_equal(ke_edges(n, m, 0.3, seed=9)[0], u)
+
+
+def grow_ke(seed, n=60, m=4, mu=0.5):
+    stream = RandomStream(make_generator(seed))
+    G      = KE_network_init(m)
+    for _ in range(n - m):
+        KE_newtwork_step(G, mu, stream)
+    return sorted(G.edges()), dict(G.nodes(data='state'))
+
+
+def test_ke_steps_reproducible():
+    assert grow_ke(4) == grow_ke(4)
+    assert grow_ke(4) != grow_ke(5)
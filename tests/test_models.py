@@ -0,0 +1,50 @@
+import pytest
+
+import turtleWorld.BarrioTortugaSEIR as BarrioTortugaSEIR
+from turtleWorld.BarrioTortugaSEIR import BarrioTortugaNX
+from turtleWorld.BarrioTortugaArray import BarrioTortugaSEIRArray, BarrioTortugaNXArray
+from turtleWorld.networks import build_ba_network, ba_csr
+from turtleWorld.utils import SUSCEPTIBLE, RECOVERED
+
+from conftest import run
+
+
+def models():
+    G                  = build_ba_network(1000, 4, seed=2)[0]
+    indptr, indices, D = ba_csr(1000, 4, seed=2)
+    return [lambda: BarrioTortugaSEIR.BarrioTortugaSEIR(turtles=1000, i0=10, ti_dist='E',
+                                                       p_dist='S', seed=1),
+            lambda: BarrioTortugaSEIRArray(turtles=1000, i0=10, tr_dist='G', seed=1),
+            lambda: BarrioTortugaNX(G, D.mean(), i0=10, seed=1),
+            lambda: BarrioTortugaNXArray((indptr, indices), D.mean(), i0=10, seed=1)]
+
+
+@pytest.mark.parametrize('i', range(4))
+def test_counts_match_scan(i, monkeypatch):
+    monkeypatch.setattr(BarrioTortugaSEIR, 'CHECK_COUNTS', True)   # raises on a mismatch
+    model = models()[i]()
+    df    = run(model, 120)
+
+    assert model.counts == model.scan_counts()
+    assert (df.sum(axis=1) == 1000).all()
+    assert df.NumberOfRecovered.iloc[-1] > 0
+
+
+@pytest.mark.parametrize('i', range(4))
+def test_seed_reproducible(i):
+    a, b = models()[i](), models()[i]()
+    assert run(a, 60).equals(run(b, 60))
+
+
+def test_il_counts_ticks_infected():
+    kw   = dict(turtles=500, i0=5, width=15, height=15, seed=3)   # tr fixed: 17.5 ticks
+    mesa = BarrioTortugaSEIR.BarrioTortugaSEIR(**kw)
+    arr  = BarrioTortugaSEIRArray(**kw)
+    run(mesa, 60)
+    run(arr, 60)
+
+    for state, tr in ((SUSCEPTIBLE, 0), (RECOVERED, 17.5)):
+        il_mesa = {t.il for t in mesa.schedule.agents if t.state == state}
+        il_arr  = set(arr.il[arr.state == state].tolist())
+        assert il_mesa == il_arr                     # the same meaning in both engines
+        assert all(tr <= il <= tr + 2 for il in il_arr)
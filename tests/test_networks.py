@@ -0,0 +1,60 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from turtleWorld.networks import (ba_edges, ba_csr, er_edges, csr_from_edges, csr_to_networkx,
+                                  degree_stats)
+
+
+def degrees_nx(n, m, seed):
+    return np.array([d for _, d in nx.barabasi_albert_graph(n, m, seed=seed).degree()])
+
+
+@pytest.mark.parametrize('m', (2, 5))
+def test_ba_edges_simple_graph(m):
+    n    = 3000
+    u, v = ba_edges(n, m, seed=3, exact=10)
+    k    = u * n + v
+
+    assert (u > v).all()
+    assert np.unique(k).size == k.size                       # no multiple links
+    assert (np.bincount(u, minlength=n)[m + 1:] == m).all()  # m links per new node
+    assert len(u) == m + (n - m - 1) * m
+
+
+@pytest.mark.parametrize('m', (2, 5))
+def test_ba_degrees_as_networkx(m):
+    n, seeds = 5000, range(6)
+    d  = np.array([ba_csr(n, m, seed=s)[2] for s in seeds])
+    dn = np.array([degrees_nx(n, m, s) for s in seeds])
+
+    assert d.mean() == pytest.approx(dn.mean())
+    assert (d[:, m + 1:] >= m).all()
+    assert np.mean(d == m) == pytest.approx(np.mean(dn == m), abs=0.02)
+    q = [0.5, 0.9, 0.99]
+    assert np.allclose(np.quantile(d, q), np.quantile(dn, q), rtol=0.15, atol=1)
+    assert d.max(axis=1).mean() == pytest.approx(dn.max(axis=1).mean(), rel=0.2)
+
+
+def test_er_edges():
+    n, p = 4000, 0.002
+    u, v = er_edges(n, p, seed=5)
+    k    = u * n + v
+
+    assert (u > v).all() and (v >= 0).all()
+    assert (np.diff(k) > 0).all()                             # sorted, no multiple links
+    pairs = n * (n - 1) // 2
+    assert abs(len(u) - p * pairs) < 5 * np.sqrt(p * pairs)
+    assert np.array_equal(er_edges(n, p, seed=5)[0], u)
+    assert len(er_edges(50, 1.0)[0]) == 50 * 49 // 2
+
+
+def test_csr_from_edges():
+    G    = nx.gnm_random_graph(200, 800, seed=1)
+    u, v = map(np.array, zip(*G.edges()))
+    indptr, indices = csr_from_edges(200, u, v)
+    H    = csr_to_networkx(indptr, indices)
+
+    assert set(map(frozenset, G.edges())) == set(map(frozenset, H.edges()))
+    assert all((np.diff(indices[indptr[i]:indptr[i + 1]]) > 0).all() for i in range(200))
+    assert degree_stats(indptr)['mean_k'] == pytest.approx(2 * 800 / 200)
@@ -0,0 +1,29 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from turtleWorld.stats import c19_nbinom_rvs, c19_weib_rvs, normal_rvs, sknormal_rvs
+from turtleWorld.networks import node_list_rnd, node_list_rnd_ki_kj
+
+SAMPLERS = [lambda rs: c19_nbinom_rvs(3.5, 0.5, size=20, random_state=rs),
+            lambda rs: c19_weib_rvs(5.0, 2.0, size=20, random_state=rs),
+            lambda rs: normal_rvs(5.0, 1.0, size=20, random_state=rs),
+            lambda rs: sknormal_rvs(5.0, 1.0, 2.0, size=20, random_state=rs),
+            lambda rs: node_list_rnd(nx.path_graph(20), random_state=rs),
+            lambda rs: node_list_rnd_ki_kj(nx.path_graph(20), 0, -1, random_state=rs)]
+
+
+@pytest.mark.parametrize('sample', SAMPLERS)
+def test_random_state(sample):
+    a = sample(np.random.default_rng(7))
+    b = sample(np.random.default_rng(7))
+    assert np.array_equal(a, b)
+    assert np.array_equal(sample(7), sample(7))
+
+    rng = np.random.default_rng(7)
+    assert not np.array_equal(sample(rng), sample(rng))
+
+
+def test_node_list_rnd_is_a_permutation():
+    G = nx.path_graph(20)
+    assert sorted(node_list_rnd(G, 1)) == list(G)
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+import turtleWorld.sweep as sweep
+from turtleWorld.sweep import design, run_sweep
+from turtleWorld.ensemble import run_replica
+from turtleWorld.BarrioTortugaArray import BarrioTortugaSEIRArray
+from turtleWorld.cache import RunCache
+
+
+class CountingCache(RunCache):
+    puts = misses = 0
+
+    def get(self, key):
+        hit = super().get(key)
+        self.misses += hit is None
+        return hit
+
+    def put(self, key, dft, stats):
+        self.puts += 1
+        return super().put(key, dft, stats)
+
+
+@pytest.mark.parametrize('kind', ('lhs', 'sobol'))
+def test_design_ranges(kind):
+    pts = design({'r0': (2, 4), 'turtles': (1000, 2000, int), 'p_dist': ['F', 'S']},
+                 kind, 16, seed=1)
+
+    assert len(pts) == 16
+    assert pts.r0.dtype == float and pts.r0.between(2, 4).all()
+    assert pts.r0.nunique() == 16                      # (2, 4) is continuous
+    assert pts.turtles.dtype.kind == 'i' and pts.turtles.between(1000, 2000).all()
+    assert set(pts.p_dist) <= {'F', 'S'}
+    assert pts.equals(design({'r0': (2, 4), 'turtles': (1000, 2000, int),
+                              'p_dist': ['F', 'S']}, kind, 16, seed=1))
+
+
+def test_design_grid():
+    pts = design({'r0': [2.5, 3.5], 'turtles': (1000, 2000, int)}, 'grid')
+    assert pts.values.tolist() == [[2.5, 1000], [2.5, 2000], [3.5, 1000], [3.5, 2000]]
+
+
+def test_sobol_needs_power_of_2():
+    with pytest.raises(ValueError):
+        design({'r0': (2.0, 4.0)}, 'sobol', 12)
+    assert len(design({'r0': (2.0, 4.0)}, 'sobol', 8)) == 8
+
+
+def test_run_sweep(tmp_path):
+    pts   = design({'r0': [2.5, 3.5], 'turtles': [200, 300]}, 'grid').iloc[[0, 3]]
+    pts   = pts.reset_index(drop=True).rename_axis('point')
+    fixed = dict(i0=2, width=12, height=12)
+    cache = CountingCache(str(tmp_path))
+
+    table = run_sweep(BarrioTortugaSEIRArray, pts, 2, 60, fixed, seed=5, workers=2, cache=cache)
+
+    assert table.index.names == ['point', 'replica']
+    assert table.index.tolist() == [(0, 0), (0, 1), (1, 0), (1, 1)]
+    assert table.r0.tolist() == [2.5, 2.5, 3.5, 3.5]
+    assert table.turtles.tolist() == [200, 200, 300, 300]
+    assert {'peak_infected', 'peak_tick', 'final_recovered'} <= set(table.columns)
+    assert table.equals(run_sweep(BarrioTortugaSEIRArray, pts, 2, 60, fixed, seed=5, workers=1))
+
+    assert cache.puts == 4
+    cache.misses = 0
+    again = run_sweep(BarrioTortugaSEIRArray, pts, 2, 60, fixed, seed=5, workers=2, cache=cache)
+    assert cache.puts == 4 and cache.misses == 0        # no job run again
+    assert again.equals(table)
+
+
+def test_jobs_by_cost(monkeypatch):
+    order = []
+    def replica(factory, params, steps, seed, job):
+        order.append(params['turtles'])
+        return run_replica(factory, params, steps, seed, job)
+    monkeypatch.setattr(sweep, 'run_replica', replica)
+
+    pts = design({'turtles': [200, 400, 300]}, 'grid')
+    run_sweep(BarrioTortugaSEIRArray, pts, 2, 20, dict(i0=2, width=12, height=12),
+              seed=5, workers=1)
+    assert order == [400, 400, 300, 300, 200, 200]
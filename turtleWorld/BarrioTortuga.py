@@ -26,13 +26,15 @@ horizontal.
    and thus the number of turtles per home is also 2.
 """
 
-from mesa import Model
 from mesa.space import MultiGrid
-from mesa.datacollection import DataCollector
 from mesa import Agent
 from mesa.time import RandomActivation
 import numpy as np
 
+from . rng import SeededModel
+from . collector import ArrayCollector
+from . checkpoint import write_checkpoint, read_checkpoint, model_attributes, new_model, fork
+
 from enum import Enum
 class PrtLvl(Enum):
     Mute     = 1
@@ -92,19 +94,11 @@ class Turtle(Agent):
             return False
 
     def avoid_turtle(self):
-        atry =  np.random.random_sample() # check awareness
-        if atry < self.model.avoid_awareness:
-            return True
-        else:
-            return False
+        return self.model.stream.throw_dice(self.model.avoid_awareness) # check awareness
 
 
     def socialize_turtle(self):
-        atry =  np.random.random_sample() # check awareness
-        if atry < self.model.social_affinity:
-            return True
-        else:
-            return False
+        return self.model.stream.throw_dice(self.model.social_affinity) # check awareness
 
 
     def filled_with_turtles(self, cell):
@@ -189,7 +183,7 @@ def number_of_turtles_in_neighborhood(model):
 
     return nc
 
-class BarrioTortuga(Model):
+class BarrioTortuga(SeededModel):
     '''
     A neighborhood where turtles goes out of their homes, walk around at random
     and meet other turtles.
@@ -201,7 +195,10 @@ class BarrioTortuga(Model):
                  turtles=250,
                  social_affinity = 0.,
                  nd=2,
-                 prtl=PrtLvl.Detailed):
+                 prtl=PrtLvl.Detailed,
+                 seed=None,
+                 collect_every=1,
+                 spill=None):
         '''
         Create a new Barrio Tortuga.
 
@@ -225,12 +222,16 @@ class BarrioTortuga(Model):
             always moves to its cell. A social affinity of -1 means that a turtle always tries
             to avoid any turtle nearby.
             nd, a parameter that decides the number of doors (largest for nd=1)
+            seed, the seed of the random streams of the model (see rng.SeededModel)
+            collect_every, spill: collect the encounters every collect_every ticks,
+            writing them in chunks to directory spill if given (see collector.ArrayCollector)
         '''
 
         # read the map
         self.map_bt                 = np.genfromtxt(map_file)
         self.social_affinity        = social_affinity
         self.avoid_awareness        = -social_affinity
+        self.seed_streams(seed)                       # rng, stream (dice) and random
 
         if print_level(prtl, PrtLvl.Concise):
             print(f'loaded barrio tortuga map with dimensions ->{ self.map_bt.shape}')
@@ -245,17 +246,10 @@ class BarrioTortuga(Model):
         self.moore                  = True
         self.turtles                = turtles
         self.schedule               = RandomActivation(self)
-        self.datacollector          = DataCollector(
-        model_reporters             = {"NumberOfEncounters": number_of_encounters}
-        )
+        self.datacollector          = self.make_collector(collect_every, spill)
 
         # create the patches representing houses and avenues
-        id = 0
-        for _, x, y in self.grid.coord_iter():
-            patch_kind = self.map_bt[x, y]               # patch kind labels buildings or streets
-            patch = Patch(id, (x, y), self, patch_kind)
-            self.grid.place_agent(patch, (x, y))         # agents are placed in the grid but not in the
-                                                         # in the schedule
+        self.place_patches()
 
         # Create turtles distributed randomly in the doors
         doors = self.get_doors(nd)
@@ -288,6 +282,85 @@ class BarrioTortuga(Model):
         self.datacollector.collect(self)
 
 
+    def make_collector(self, every=1, spill=None, clear=True):
+        return ArrayCollector(
+        model_reporters             = {"NumberOfEncounters": number_of_encounters},
+        every                       = every,
+        spill                       = spill,
+        clear                       = clear
+        )
+
+
+    def place_patches(self):
+        id = 0
+        for _, x, y in self.grid.coord_iter():
+            patch_kind = self.map_bt[x, y]               # patch kind labels buildings or streets
+            patch = Patch(id, (x, y), self, patch_kind)
+            self.grid.place_agent(patch, (x, y))         # agents are placed in the grid but not in the
+                                                         # in the schedule
+
+
+    def checkpoint_state(self):
+        """The state of the barrio: map, parameters, turtles (in the order of the
+        scheduler), random streams and collected data.
+
+        """
+        turtles = self.schedule.agents
+        return dict(model     = model_attributes(self),
+                    random    = self.random_state(),
+                    steps     = self.schedule.steps,
+                    time      = self.schedule.time,
+                    collector = self.datacollector.checkpoint(),
+                    unique_id = np.array([t.unique_id for t in turtles]),
+                    x         = np.array([t.pos[0] for t in turtles]),
+                    y         = np.array([t.pos[1] for t in turtles]))
+
+
+    def save_checkpoint(self, path):
+        """Saves the barrio in path (a .npz file, see checkpoint)"""
+        write_checkpoint(path, self.checkpoint_state())
+
+
+    @classmethod
+    def load_checkpoint(cls, path):
+        """The barrio saved in path by save_checkpoint"""
+        return cls.from_state(read_checkpoint(path))
+
+
+    @classmethod
+    def from_state(cls, state, seed=None):
+        """The barrio of checkpoint_state, with new random streams if seed is not None"""
+        model = new_model(cls, state['model'], state['random'], seed)
+        c     = state['collector']
+        model.datacollector = model.make_collector(c['every'], c['spill'], clear=False)
+        model.datacollector.restore(c)
+
+        model.grid     = MultiGrid(model.height, model.width, torus=True)
+        model.place_patches()
+        model.schedule = RandomActivation(model)
+        for i, x, y in zip(state['unique_id'].tolist(), state['x'].tolist(), state['y'].tolist()):
+            a = Turtle(i, (x, y), model, model.moore)
+            model.schedule.add(a)
+            model.grid.place_agent(a, (x, y))
+        model.schedule.steps = state['steps']
+        model.schedule.time  = state['time']
+        return model
+
+
+    def fork(self, variants=1, seed=None):
+        """Branches of the run, e.g, fork([dict(social_affinity=-0.5)] * 10): see
+        BarrioTortugaBase.fork.
+
+        """
+        return fork(self, variants, seed)
+
+
+    def apply_changes(self, social_affinity=None):
+        if social_affinity is not None:
+            self.social_affinity = social_affinity
+            self.avoid_awareness = -social_affinity
+
+
     def get_doors(self, nd):
         l,w = self.map_bt.shape
         D = []
@@ -0,0 +1,318 @@
+"""
+Array-backed engines for the SEIR turtle models.
+
+The Mesa models in BarrioTortugaSEIR step one agent object at a time. The engines
+in this module keep the state of all the turtles in NumPy arrays and compute each
+tick with whole-array operations. They report the same quantities
+(NumberOfInfected, NumberOfSusceptible, NumberOfRecovered, NumberOfExposed)
+through the same data collector and compartment counters, but have no agents to
+portray, thus they are meant for batch runs, not for the visualization server.
+
+BarrioTortugaSEIRArray is the engine of BarrioTortugaSEIR (turtles moving in a
+grid), BarrioTortugaNXArray that of BarrioTortugaNX (turtles on the nodes of a
+network, held as CSR adjacency arrays). Both share the tick of ArrayEngine.
+"""
+
+import numpy as np
+import networkx as nx
+
+from . BarrioTortugaSEIR import BarrioTortugaBase
+from . networks import adjacency_arrays
+from . utils import PrtLvl, print_level
+from . utils import SUSCEPTIBLE, EXPOSED, INFECTED, RECOVERED, KINDS
+
+prtl=PrtLvl.Concise
+
+# Moore neighborhood, including the own cell
+MOORE = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+class ArrayEngine(BarrioTortugaBase):
+    """The tick of the array engines. The subclasses create the arrays of the
+    turtles (state, il, iel, iil, ti_ticks, tr_ticks, Ti, Tr, P, log_escape) and
+    define infect(infected) and random_move(). The model parameters ti, tr (the
+    mean times, in days) stay scalars, as in the Mesa models.
+
+    """
+
+    def step(self):
+        t = self.schedule.steps
+
+        infected    = self.state == INFECTED
+        exposed     = self.state == EXPOSED
+        self.il[infected] += 1                  # ticks active, as the Mesa turtles
+
+        self.infect(infected)
+
+        # E --> I
+        new_i = exposed & (t - self.iel > self.ti_ticks)
+        self.state[new_i] = INFECTED
+        self.iil[new_i]  = t
+
+        # I --> R
+        new_r = infected & (t - self.iil > self.tr_ticks)
+        self.state[new_r] = RECOVERED
+
+        ni = int(np.count_nonzero(new_i))
+        nr = int(np.count_nonzero(new_r))
+        self.counts[EXPOSED]   -= ni
+        self.counts[INFECTED]  += ni - nr
+        self.counts[RECOVERED] += nr
+
+        if print_level(prtl, PrtLvl.Detailed):
+            print(f' tick {t}: E -> I = {ni}, I -> R = {nr}')
+
+        self.random_move()
+        self.schedule.step()     # no agents: advances the clock
+        self.collect()
+        self.running = self.epidemic_is_active()
+        if not self.running:
+            self.datacollector.collect_last(self)
+
+
+    def set_log_escape(self):
+        """log of the probability of not being infected by each turtle"""
+        with np.errstate(divide='ignore'):
+            self.log_escape = np.log1p(-np.minimum(self.P, np.float32(1)))
+
+
+    def apply_changes(self, r0=None, p=None):
+        super().apply_changes(r0, p)
+        self.set_log_escape()
+
+
+    def scan_counts(self):
+        return np.bincount(self.state, minlength=len(KINDS)).tolist()
+
+
+    def expose(self, hit):
+        """Susceptible turtles hit become exposed"""
+        self.state[hit] = EXPOSED
+        self.iel[hit]  = self.schedule.steps    # tag = infection time
+        self.counts[SUSCEPTIBLE] -= hit.size
+        self.counts[EXPOSED]     += hit.size
+
+
+class BarrioTortugaSEIRArray(ArrayEngine):
+    """Array version of BarrioTortugaSEIR.
+
+    Takes the same parameters as BarrioTortugaSEIR. The turtles are described by
+    the arrays:
+        state     : S, E, I, R coded as integers (int8, see utils.KINDS)
+        x, y      : position in the torus (uint16)
+        il        : ticks spent active, that is infected (int32)
+        iel, iil  : tick in which the turtle was exposed, became infected (int32)
+        ti_ticks, tr_ticks: incubation, recovery time in ticks (float32)
+        Ti, Tr, P : the same in days, and the transmission probability (float32)
+        log_escape: log(1 - P) (float32)
+
+    that is 41 bytes per turtle (see bytes_per_agent), thus 10^6 turtles need
+    about 40 MB.
+
+    A tick is computed as in the Mesa model, except that all turtles act at once:
+        1) Each infected turtle tries to infect all the susceptibles in its Moore
+           neighborhood (own cell included) with probability p. A susceptible escapes
+           if it escapes all the infected around it, that is with probability
+           prod_j (1 - p_j). The product is computed per cell as a sum of logs, and
+           the neighborhood as the sum of the 9 shifted (rolled) grids.
+        2) Exposed turtles with t - iel > ti become infected, infected turtles
+           with t - iil > tr become recovered.
+        3) All turtles move to a random cell of their Moore neighborhood.
+
+    The Mesa scheduler is kept (empty) as the clock of the model.
+    """
+
+    def __init__(self,
+                 ticks_per_day =    5,
+                 turtles       = 1000,
+                 i0            =   10,
+                 r0            =    3.5,
+                 ti            =    5.5,
+                 tr            =    3.5,
+                 ti_dist       =    'F',    # F for fixed, E for exp G for Gamma
+                 tr_dist       =    'F',
+                 p_dist        =    'F',    # F for fixed, S for Binomial, P for Poissoin
+                 width         =   40,
+                 height        =   40,
+                 seed          =   None,
+                 collect_every =   1,
+                 spill         =   None):
+
+        super().__init__(ticks_per_day, i0, r0, ti, tr, ti_dist, tr_dist, p_dist, seed,
+                         collect_every, spill)
+
+        self.height     = height
+        self.width      = width
+        self.moore      = True  # always 9 cells
+        self.turtles    = turtles
+        self.nc         = 9 * self.turtles / (self.width * self.height)
+        self.p          = self.infection_prob(self.nc)
+
+        if print_level(prtl, PrtLvl.Concise):
+            self.print_gen_simul_params()
+            print(f""" Additional Simulation Parameters:
+                Grid (w x h)            = {self.width} x {self.height}
+                Engine                  = arrays
+            """)
+
+        # Create turtles
+        n           = self.turtles
+        self.state  = self.initial_states()        # S and I in random order
+
+        self.x      = self.rng.integers(self.width,  size=n, dtype=np.uint16)
+        self.y      = self.rng.integers(self.height, size=n, dtype=np.uint16)
+        self.il     = np.zeros(n, dtype=np.int32)
+        self.iel    = np.zeros(n, dtype=np.int32)
+        self.iil    = np.zeros(n, dtype=np.int32)
+
+        self.draw_turtle_params(n)                 # Ti, Tr, P
+        self.ti_ticks = self.Ti * np.float32(ticks_per_day)
+        self.tr_ticks = self.Tr * np.float32(ticks_per_day)
+        self.set_log_escape()
+
+        self.counts = self.scan_counts()
+
+        self.running = True
+        self.collect()
+
+
+    def bytes_per_agent(self):
+        arrays = (self.state, self.x, self.y, self.il, self.iel, self.iil,
+                  self.ti_ticks, self.tr_ticks, self.Ti, self.Tr, self.P, self.log_escape)
+        return sum(a.itemsize for a in arrays)
+
+
+    def cell_index(self):
+        return self.x.astype(np.intp) * self.height + self.y
+
+
+    def infect(self, infected):
+        cell    = self.cell_index()
+        ncells  = self.width * self.height
+
+        # sum of log escape probabilities of the infected in each cell
+        lcell = np.bincount(cell[infected], weights=self.log_escape[infected],
+                            minlength=ncells).reshape(self.width, self.height)
+
+        # ... and in the Moore neighborhood of each cell
+        lnb = np.zeros_like(lcell)
+        for dx, dy in MOORE:
+            lnb += np.roll(lcell, (dx, dy), axis=(0, 1))
+
+        sus   = np.flatnonzero(self.state == SUSCEPTIBLE)
+        pinf  = -np.expm1(lnb.ravel()[cell[sus]])
+        hit   = sus[self.rng.random(sus.size) < pinf]
+        self.expose(hit)
+
+
+    def random_move(self):
+        n = self.turtles
+        dx = self.rng.integers(-1, 2, size=n, dtype=np.int8)
+        dy = self.rng.integers(-1, 2, size=n, dtype=np.int8)
+        self.x = ((self.x + dx) % self.width).astype(np.uint16)
+        self.y = ((self.y + dy) % self.height).astype(np.uint16)
+
+
+class BarrioTortugaNXArray(ArrayEngine):
+    """Array version of BarrioTortugaNX.
+
+    Takes the same parameters as BarrioTortugaNX; G is a networkx graph or its
+    adjacency in CSR form, a pair of arrays (indptr, indices) (e.g, of
+    networks.adjacency_arrays). The graph is converted once to CSR: turtle i
+    lives in node i (the i-th node of G) and its neighbors are
+    indices[indptr[i]:indptr[i + 1]]. The turtles are described by the arrays
+    of BarrioTortugaSEIRArray but x, y.
+
+    In a tick all the infected turtles act at once: the neighbors of all the
+    infected are gathered from the CSR arrays in one pass, and each susceptible
+    among them escapes with probability prod_j (1 - p_j) over its infected
+    neighbors j (a sum of log_escape per node, computed with bincount).
+    """
+
+    def __init__(self,
+                 G,
+                 neighbors,
+                 ticks_per_day =    5,
+                 i0            =   10,
+                 r0            =    3.5,
+                 ti            =    5.5,
+                 tr            =    6.5,
+                 ti_dist       =    'F',    # F for fixed, E for exp G for Gamma
+                 tr_dist       =    'F',
+                 p_dist        =    'F',    # F for fixed, S for Binomial, P for Poissoin
+                 seed          =    None,
+                 collect_every =    1,
+                 spill         =    None):
+
+        super().__init__(ticks_per_day, i0, r0, ti, tr, ti_dist, tr_dist, p_dist, seed,
+                         collect_every, spill)
+
+        if isinstance(G, nx.Graph):
+            _, self.indptr, self.indices = adjacency_arrays(G)
+        else:
+            self.indptr, self.indices = G
+        self.turtles    = len(self.indptr) - 1
+        self.nc         = neighbors
+        self.p          = self.infection_prob(self.nc)
+
+        if print_level(prtl, PrtLvl.Concise):
+            self.print_gen_simul_params()
+            print(f""" Additional Simulation Parameters:
+                Network (nodes, edges)  = {self.turtles}, {len(self.indices) // 2}
+                Engine                  = arrays
+            """)
+
+        # Create turtles
+        n           = self.turtles
+        self.draw_turtle_params(n)                 # Ti, Tr, P
+        self.state  = self.initial_states()        # S and I in random order
+
+        if print_level(prtl, PrtLvl.Concise):
+            self.print_first_turtles(self.state)
+
+        self.il     = np.zeros(n, dtype=np.int32)
+        self.iel    = np.zeros(n, dtype=np.int32)
+        self.iil    = np.zeros(n, dtype=np.int32)
+        self.ti_ticks = self.Ti * np.float32(ticks_per_day)
+        self.tr_ticks = self.Tr * np.float32(ticks_per_day)
+        self.set_log_escape()
+
+        self.counts = self.scan_counts()
+
+        self.running = True
+        self.collect()
+
+
+    def bytes_per_agent(self):
+        """Bytes per turtle, the adjacency arrays included"""
+        arrays = (self.state, self.il, self.iel, self.iil,
+                  self.ti_ticks, self.tr_ticks, self.Ti, self.Tr, self.P, self.log_escape)
+        graph  = self.indptr.nbytes + self.indices.nbytes
+        return sum(a.itemsize for a in arrays) + graph / self.turtles
+
+
+    def neighbors_of(self, nodes):
+        """The neighbors of nodes, concatenated, and the node each comes from"""
+        start = self.indptr[nodes]
+        deg   = self.indptr[nodes + 1] - start
+        first = np.cumsum(deg) - deg                 # of each node in the output
+        edges = np.arange(deg.sum()) + np.repeat(start - first, deg)
+        return self.indices[edges], np.repeat(nodes, deg)
+
+
+    def infect(self, infected):
+        nbr, src = self.neighbors_of(np.flatnonzero(infected))
+        sus      = self.state[nbr] == SUSCEPTIBLE
+        nbr, src = nbr[sus], src[sus]
+
+        # sum of log escape probabilities of the infected around each susceptible
+        lnb   = np.bincount(nbr, weights=self.log_escape[src], minlength=self.turtles)
+        sus   = np.unique(nbr)
+        pinf  = -np.expm1(lnb[sus])
+        hit   = sus[self.rng.random(sus.size) < pinf]
+        self.expose(hit)
+
+
+    def random_move(self):
+        """The turtles stay in their nodes"""
+        pass
@@ -1,8 +1,5 @@
-from mesa import Model
 from mesa.space import MultiGrid, NetworkGrid
-from mesa.datacollection import DataCollector
 from mesa import Agent
-from mesa.time import RandomActivation
 import numpy as np
 
 from scipy.stats import gamma
@@ -13,21 +10,44 @@ from . turtle_functions import number_of_infected
 from . turtle_functions import number_of_susceptible
 from . turtle_functions import number_of_recovered
 from . turtle_functions import number_of_exposed
+from . turtle_functions import count_states
 
-from . utils import PrtLvl, print_level, throw_dice, in_range
+from . utils import PrtLvl, print_level, in_range
+from . utils import SUSCEPTIBLE, EXPOSED, INFECTED, RECOVERED, KINDS
+from . spatial import TorusIndex
+from . scheduler import StateActivation, TransitionCalendar, due_tick
+from . rng import SeededModel
+from . collector import ArrayCollector
+from . checkpoint import write_checkpoint, read_checkpoint, model_attributes, new_model, fork
+from . networks import adjacency_arrays, graph_from_adjacency
 
 CALIB = False
+CHECK_COUNTS = False   # debug: cross-check the compartment counters with a full scan
 prtl=PrtLvl.Concise
 
-def get_time(t_dist, t_mean):
+# attributes of the turtles saved in the checkpoints
+TURTLE_ATTRIBUTES = ('unique_id', 'state', 'p', 'ti', 'tr', 'il', 'iil', 'iel')
+
+def get_time(t_dist, t_mean, random_state=None):
     if t_dist == 'E':
-        return expon.rvs(scale=t_mean)
+        return expon.rvs(scale=t_mean, random_state=random_state)
     elif t_dist == 'G':
-        return gamma.rvs(a=t_mean, scale=1.0)
+        return gamma.rvs(a=t_mean, scale=1.0, random_state=random_state)
     else:
         return t_mean
 
-class BarrioTortugaBase(Model):
+
+def get_times(t_dist, t_mean, size, random_state=None):
+    """Vectorised version of get_time: size draws in a single call"""
+    if t_dist == 'E':
+        return expon.rvs(scale=t_mean, size=size, random_state=random_state)
+    elif t_dist == 'G':
+        return gamma.rvs(a=t_mean, scale=1.0, size=size, random_state=random_state)
+    else:
+        return np.full(size, t_mean, dtype=float)
+
+
+class BarrioTortugaBase(SeededModel):
     """Base class for Turtle models of SEIR epidemics.
 
         The parameters are:
@@ -44,6 +64,25 @@ class BarrioTortugaBase(Model):
 
         This is controlled through parameters ti_dist, tr_dist and p_dist
 
+        The model keeps live counters of the turtles in each compartment (self.counts,
+        indexed by state code), updated by the turtles at each change of state, so
+        that the reporters do not need to scan the population. Set CHECK_COUNTS = True
+        to cross-check them.
+
+        The changes of state E --> I and I --> R are not polled: they are booked in a
+        calendar (self.calendar) when the turtle is exposed or becomes infected, and
+        applied at the end of the tick in which they are due.
+
+        The scheduler (StateActivation) only activates the infected turtles.
+        The run stops (self.running = False) when there are no exposed or infected left.
+
+        All the random numbers derive from the parameter seed (see rng.SeededModel):
+        two models built with the same seed run identically.
+
+        The reporters are collected (see collector.ArrayCollector) every
+        collect_every ticks ('day' for once per day); with spill (a directory) the
+        collected data are written to disk in chunks as the run goes.
+
     """
     def __init__(self,
                  ticks_per_day =    5,
@@ -53,10 +92,14 @@ class BarrioTortugaBase(Model):
                  tr            =    6.5,
                  ti_dist       =    'F',    # F for fixed, E for exp G for Gamma
                  tr_dist       =    'F',
-                 p_dist        =    'F'     # F for fixed, S for Binomial, P for Poissoin
+                 p_dist        =    'F',    # F for fixed, S for Binomial, P for Poissoin
+                 seed          =    None,   # None, int or numpy SeedSequence
+                 collect_every =    1,      # ticks, or 'day'
+                 spill         =    None    # directory for the collected data
                  ):
 
 
+        self.seed_streams(seed)           # rng, stream (dice) and random
         self.ticks_per_day = ticks_per_day
         self.i0            = i0
         self.r0            = r0
@@ -68,8 +111,10 @@ class BarrioTortugaBase(Model):
         self.P        = []
         self.Ti       = []
         self.Tr       = []
+        self.counts   = [0] * len(KINDS)
 
-        self.schedule   = RandomActivation(self)
+        self.schedule   = StateActivation(self, active=(INFECTED,))
+        self.calendar   = TransitionCalendar()
 
         # Prob
         self.k = 1
@@ -78,12 +123,9 @@ class BarrioTortugaBase(Model):
         elif self.p_dist == 'P':
             self.k = 1e+4
 
-        self.datacollector          = DataCollector(
-        model_reporters             = {"NumberOfInfected": number_of_infected,
-                                       "NumberOfSusceptible": number_of_susceptible,
-                                       "NumberOfRecovered": number_of_recovered,
-                                       "NumberOfExposed": number_of_exposed}
-            )
+        if collect_every == 'day':
+            collect_every = ticks_per_day
+        self.datacollector = self.make_collector(collect_every, spill)
 
         if print_level(prtl, PrtLvl.Concise):
             print(f""" Simulation Parameters:
@@ -108,19 +150,238 @@ class BarrioTortugaBase(Model):
 
 
     def step(self):
+        tick = self.schedule.steps
         self.schedule.step()
+        self.apply_transitions(tick)
+        self.collect()
+        self.running = self.epidemic_is_active()
+        if not self.running:
+            self.datacollector.collect_last(self)
+
+
+    def apply_transitions(self, tick):
+        for turtle, state in self.calendar.pop(tick):
+            if state == INFECTED:
+                turtle.become_infected(tick)
+            else:
+                turtle.become_recovered(tick)
+
+
+    def epidemic_is_active(self):
+        return self.counts[EXPOSED] + self.counts[INFECTED] > 0
+
+
+    def collect(self):
+        if CHECK_COUNTS:
+            self.check_counts()
         self.datacollector.collect(self)
 
 
+    def scan_counts(self):
+        return count_states(self.schedule.agents)
+
+
+    def check_counts(self):
+        counts = self.scan_counts()
+        if counts != self.counts:
+            raise AssertionError(f'compartment counters {self.counts} differ from scan {counts}'
+                                 f' at step {self.schedule.steps}')
+
+
+    def make_collector(self, every=1, spill=None, clear=True):
+        return ArrayCollector(
+        model_reporters             = {"NumberOfInfected": number_of_infected,
+                                       "NumberOfSusceptible": number_of_susceptible,
+                                       "NumberOfRecovered": number_of_recovered,
+                                       "NumberOfExposed": number_of_exposed},
+        every                       = every,
+        spill                       = spill,
+        clear                       = clear
+            )
+
+
+    def checkpoint_state(self):
+        """The state of the model as a dict of values and arrays: parameters,
+        counters, turtles, scheduler, calendar, random streams and collected data.
+
+        """
+        return dict(model     = model_attributes(self),
+                    random    = self.random_state(),
+                    steps     = self.schedule.steps,
+                    time      = self.schedule.time,
+                    collector = self.datacollector.checkpoint(),
+                    agents    = self.checkpoint_agents())
+
+
+    def save_checkpoint(self, path):
+        """Saves the model in path (a .npz file, see checkpoint). The model
+        restored by load_checkpoint runs on exactly as this one.
+
+        """
+        write_checkpoint(path, self.checkpoint_state())
+
+
+    @classmethod
+    def load_checkpoint(cls, path, **kwargs):
+        """The model saved in path by save_checkpoint. kwargs are passed to
+        restore_agents (e.g, the graph G of BarrioTortugaNX).
+
+        """
+        return cls.from_state(read_checkpoint(path), **kwargs)
+
+
+    @classmethod
+    def from_state(cls, state, seed=None, **kwargs):
+        """The model of checkpoint_state, with new random streams if seed is not None"""
+        model = new_model(cls, state['model'], state['random'], seed)
+        c     = state['collector']
+        model.datacollector = model.make_collector(c['every'], c['spill'], clear=False)
+        model.datacollector.restore(c)
+        model.calendar = TransitionCalendar()
+        model.restore_agents(state['agents'], **kwargs)
+        model.schedule.steps = state['steps']
+        model.schedule.time  = state['time']
+        return model
+
+
+    def fork(self, variants=1, seed=None):
+        """Branches of the run: copies of the model in its current state, each with
+        its own random streams (see SeededModel.branch_seeds) and the parameter
+        changes of its variant (see apply_changes). variants is a list of dicts of
+        changes, e.g, [dict(r0=2), dict(r0=1.5)], or a number of unchanged copies.
+        The run up to here is simulated only once for all the branches.
+
+        """
+        return fork(self, variants, seed)
+
+
+    def apply_changes(self, r0=None, p=None):
+        """Changes the transmission of the turtles from now on: to the basic
+        reproductive number r0, or to the infection probability p (of the fixed
+        case). The probabilities of all the turtles are scaled accordingly. The
+        rescaling uses the scalar model parameters (r0, p and the mean tr).
+
+        """
+        if r0 is not None:
+            factor  = float(r0) / float(self.r0)
+            self.r0 = float(r0)
+            self.p  = float(self.infection_prob(self.nc))
+        elif p is not None:
+            factor  = float(p) / float(self.p)
+            self.p  = float(p)
+            self.r0 = float(p * self.nc * self.tr * self.ticks_per_day)
+        else:
+            return
+
+        self.P = (self.P * factor).astype(np.float32)
+        for turtle in self.schedule.agents:
+            turtle.p *= factor
+
+
+    def checkpoint_agents(self):
+        """The agents to save (none: models without agents keep all in arrays)"""
+        return {}
+
+
+    def restore_agents(self, agents):
+        self.schedule = StateActivation(self, active=(INFECTED,))
+
+
+    def turtle_arrays(self):
+        """Arrays of the turtle attributes (in the order of the scheduler), the
+        buckets of the scheduler and the calendar, as (state, id) and (tick, id,
+        state) rows, in their order.
+
+        """
+        turtles = self.schedule.agents
+        if any(t.stream is not self.stream for t in turtles):
+            raise ValueError('the checkpoints do not keep per-agent streams')
+
+        A = {name: np.array([getattr(t, name) for t in turtles]) for name in TURTLE_ATTRIBUTES}
+        A['state']    = A['state'].astype(np.int8)
+        A['buckets']  = np.array([(state, uid) for state, bucket in self.schedule.buckets.items()
+                                               for uid in bucket], dtype=np.int64).reshape(-1, 2)
+        A['calendar'] = np.array([(tick, turtle.unique_id, state)
+                                  for tick, bucket in self.calendar.buckets.items()
+                                  for turtle, state in bucket], dtype=np.int64).reshape(-1, 3)
+        return A
+
+
+    def restore_turtles(self, turtle_class, A, positions):
+        """Rebuilds the turtles from turtle_arrays (and their positions) and adds
+        them to the scheduler, with its buckets and the calendar as saved.
+
+        """
+        columns = [A[name].tolist() for name in TURTLE_ATTRIBUTES]
+        turtles = [turtle_class.restore(self, pos, *attributes)
+                   for pos, *attributes in zip(positions, *columns)]
+
+        agents = self.schedule._agents
+        for t in turtles:
+            agents[t.unique_id] = t
+        for state, uid in A['buckets'].reshape(-1, 2).tolist():
+            self.schedule.buckets.setdefault(state, {})[uid] = agents[uid]
+        for tick, uid, state in A['calendar'].reshape(-1, 3).tolist():
+            self.calendar.schedule(tick, agents[uid], state)
+        return turtles
+
+
     def get_prob(self):
         if self.p_dist == 'S' or self.p_dist == 'P':
-            r0  = c19_nbinom_rvs(self.r0, self.k) # self.k decided which one
+            r0  = c19_nbinom_rvs(self.r0, self.k, random_state=self.rng) # self.k decided which one
             p   = r0 /(self.nc * self.tr * self.ticks_per_day)
         else:
             p = self.p
         return p
 
 
+    def get_probs(self, size):
+        """Vectorised version of get_prob: size draws in a single call"""
+        if self.p_dist == 'S' or self.p_dist == 'P':
+            r0  = np.atleast_1d(c19_nbinom_rvs(self.r0, self.k, size=size,
+                                               random_state=self.rng))
+            p   = r0 /(self.nc * self.tr * self.ticks_per_day)
+        else:
+            p   = np.full(size, self.p)
+        return p.astype(np.float32)
+
+
+    def draw_turtle_params(self, n):
+        """Draws the incubation times (Ti), recovery times (Tr), both in days, and
+        the infection probabilities (P) of n turtles, as float32 arrays.
+
+        """
+        self.Ti = get_times(self.ti_dist, self.ti, n, self.rng).astype(np.float32)
+        self.Tr = get_times(self.tr_dist, self.tr, n, self.rng).astype(np.float32)
+        self.P  = self.get_probs(n)
+
+
+    def initial_states(self):
+        """Array of the states of the turtles: i0 infected, the rest susceptible,
+        in random order
+
+        """
+        A = np.full(self.turtles, SUSCEPTIBLE, dtype=np.int8)
+        A[:self.i0] = INFECTED
+        self.rng.shuffle(A)
+        return A
+
+
+    def use_agent_streams(self):
+        """Gives each turtle its own random stream (see SeededModel.agent_stream),
+        for its dice throws and moves, instead of the stream of the model. It costs
+        about 2 kB per turtle.
+
+        """
+        for turtle in self.schedule.agents:
+            turtle.stream = self.agent_stream(turtle.unique_id)
+
+
+    def print_first_turtles(self, A, n=5):
+        for i, at in enumerate(A[:n]):
+            print (f' creating {KINDS[at]} turtle number {i} with ti = {self.Ti[i]}, tr = {self.Tr[i]}, p ={self.P[i]:.2e}')
+
+
     def infection_prob(self, nc):
         # infection probability for fixed case
         return self.r0 /(nc * self.tr * self.ticks_per_day)
@@ -192,15 +453,23 @@ class BarrioTortugaSEIR(BarrioTortugaBase):
                  tr_dist       =    'F',
                  p_dist        =    'F',    # F for fixed, S for Binomial, P for Poissoin
                  width         =   40,
-                 height        =   40):
+                 height        =   40,
+                 seed          =   None,
+                 collect_every =   1,
+                 spill         =   None):
 
-        super().__init__(ticks_per_day, i0, r0, ti, tr, ti_dist, tr_dist, p_dist)
+        super().__init__(ticks_per_day, i0, r0, ti, tr, ti_dist, tr_dist, p_dist, seed,
+                         collect_every, spill)
 
         # define grid and schedule
         self.height     = height
         self.width      = width
         self.grid       = MultiGrid(self.height, self.width, torus=True)
         self.moore      = True  # always 9 cells
+        self.cells      = TorusIndex(self.grid.width, self.grid.height, self.moore)
+
+        # infection phase for infected turtles, then all turtles move
+        self.schedule   = StateActivation(self, active=(INFECTED,), all_stage='random_move')
         self.turtles  = turtles
 
         # average number of contacts:  nc = 9 * N / area
@@ -221,54 +490,61 @@ class BarrioTortugaSEIR(BarrioTortugaBase):
         if CALIB:  # only susceptible agents
             for i in range(self.turtles):
                 x,y = self.random_pos()           # random position
-                a = SeirTurtle(i, (x, y), 'S', ti, tr, 1, self)
+                a = SeirTurtle(i, (x, y), SUSCEPTIBLE, ti, tr, 1, self)
                 self.schedule.add(a)              # add to schedule
                 self.grid.place_agent(a, (x, y))  # added to schedule
+                self.cells.add(a, (x, y))         # and to the index
 
-        else:
-            ss = self.turtles - i0            # number of susceptibles
-            A = ss * ['S'] + i0 * ['I']
-            np.random.shuffle(A)              # in random order
+        else:  # bulk creation
+            n = self.turtles
+            self.draw_turtle_params(n)         # Ti, Tr, P of all turtles at once
+            A = self.initial_states()          # S and I in random order
+            X = self.rng.integers(self.width,  size=n).tolist()   # random positions
+            Y = self.rng.integers(self.height, size=n).tolist()
 
-            for i, at in enumerate(A):
-                x,y = self.random_pos()           # random position
-                ti = get_time(self.ti_dist, self.ti)
-                #print(f'from exp  ti ={ti}')
-                tr = get_time(self.tr_dist, self.tr)
-                p  = self.get_prob()
-                self.Ti.append(ti)
-                self.Tr.append(tr)
-                self.P.append(p)
-
-                if print_level(prtl, PrtLvl.Concise):
-                    if i < 5:
-                        print (f' creating turtle number {i} with ti = {ti}, tr = {tr}, p ={p:.2e}')
-
-                if at == 'I':
-                    if print_level(prtl, PrtLvl.Concise):
-                        if i < 5:
-                            print (f' creating I turtle')
-
-                    a = SeirTurtle(i, (x, y), 'I',
-                                   ti * ticks_per_day,
-                                   tr * ticks_per_day, p,
-                                   self)
-
-                else:
-                    if print_level(prtl, PrtLvl.Concise):
-                        if i < 5:
-                            print (f' creating S turtle')
-
-                    a = SeirTurtle(i, (x, y), 'S',
-                                   ti * ticks_per_day,
-                                   tr * ticks_per_day, p,
-                                   self)
+            if print_level(prtl, PrtLvl.Concise):
+                self.print_first_turtles(A)
 
-                self.schedule.add(a)              # add to schedule
-                self.grid.place_agent(a, (x, y))  # added to schedule
+            TI = (self.Ti * ticks_per_day).tolist()   # in ticks
+            TR = (self.Tr * ticks_per_day).tolist()
+            turtles = [SeirTurtle(i, (x, y), at, ti, tr, p, self)
+                       for i, (at, x, y, ti, tr, p) in enumerate(zip(A.tolist(), X, Y, TI, TR,
+                                                                     self.P.tolist()))]
+            self.place_turtles(turtles)
 
         self.running = True
-        self.datacollector.collect(self)
+        self.collect()
+
+
+    def checkpoint_agents(self):
+        A = self.turtle_arrays()
+        A['x']     = np.array([t.pos[0] for t in self.schedule.agents], dtype=np.int32)
+        A['y']     = np.array([t.pos[1] for t in self.schedule.agents], dtype=np.int32)
+        A['cells'] = np.array([(uid, x, y) for (x, y), bucket in self.cells.susceptibles.items()
+                                           for uid in bucket], dtype=np.int64).reshape(-1, 3)
+        return A
+
+
+    def restore_agents(self, A):
+        self.grid     = MultiGrid(self.height, self.width, torus=True)
+        self.cells    = TorusIndex(self.grid.width, self.grid.height, self.moore)
+        self.schedule = StateActivation(self, active=(INFECTED,), all_stage='random_move')
+
+        positions = zip(A['x'].tolist(), A['y'].tolist())
+        for t in self.restore_turtles(SeirTurtle, A, positions):
+            self.grid.place_agent(t, t.pos)
+        agents = self.schedule._agents
+        for uid, x, y in A['cells'].reshape(-1, 3).tolist():
+            self.cells.add(agents[uid], (x, y))
+
+
+    def place_turtles(self, turtles):
+        schedule, grid, cells = self.schedule, self.grid, self.cells
+        for a in turtles:
+            schedule.add(a)                # add to schedule
+            grid.place_agent(a, a.pos)     # added to grid
+            if a.state == SUSCEPTIBLE:
+                cells.add(a, a.pos)        # index of susceptibles
 
 
     def random_pos(self):
@@ -298,9 +574,13 @@ class BarrioTortugaNX(BarrioTortugaBase):
                  ti_dist       =    'F',    # F for fixed, E for exp G for Gamma
                  tr_dist       =    'F',
                  p_dist        =    'F',    # F for fixed, S for Binomial, P for Poissoin
+                 seed          =    None,
+                 collect_every =    1,
+                 spill         =    None
                  ):
 
-        super().__init__(ticks_per_day, i0, r0, ti, tr, ti_dist, tr_dist, p_dist)
+        super().__init__(ticks_per_day, i0, r0, ti, tr, ti_dist, tr_dist, p_dist, seed,
+                         collect_every, spill)
         # define grid and schedule
 
         self.grid = NetworkGrid(G)
@@ -314,92 +594,124 @@ class BarrioTortugaNX(BarrioTortugaBase):
 
 
         # Create turtles
-        ss = self.turtles - i0            # number of susceptibles
-        A = ss * ['S'] + i0 * ['I']
-        np.random.shuffle(A)              # in random order
+        n = self.turtles
+        self.draw_turtle_params(n)         # Ti, Tr, P of all turtles at once
+        A = self.initial_states()          # S and I in random order
+
+        if print_level(prtl, PrtLvl.Concise):
+            self.print_first_turtles(A)
 
-        for i, at in enumerate(A):
-            ti = get_time(self.ti_dist, self.ti)
-            tr = get_time(self.tr_dist, self.tr)
-            p  = self.get_prob()
+        TI = (self.Ti * ticks_per_day).tolist()   # in ticks
+        TR = (self.Tr * ticks_per_day).tolist()
+        turtles = [NXTurtle(i, at, ti, tr, p, self)
+                   for i, (at, ti, tr, p) in enumerate(zip(A.tolist(), TI, TR,
+                                                           self.P.tolist()))]
+        self.place_turtles(turtles)
 
-            self.Ti.append(ti)
-            self.Tr.append(tr)
-            self.P.append(p)
+        self.running = True
+        self.collect()
 
-            if print_level(prtl, PrtLvl.Concise):
-                if i < 5:
-                    print (f' creating turtle number {i} with ti = {ti}, tr = {tr}, p ={p:.2e}')
 
-            if at == 'I':
-                if print_level(prtl, PrtLvl.Concise):
-                    if i < 5:
-                        print (f' creating I turtle')
+    def checkpoint_agents(self):
+        A = self.turtle_arrays()
+        A['pos'] = np.array([t.pos for t in self.schedule.agents])
+        A['nodes'], A['indptr'], A['indices'] = adjacency_arrays(self.grid.G)
+        return A
 
-                a = NXTurtle(i,  'I',
-                                   ti * ticks_per_day,
-                                   tr * ticks_per_day, p,
-                                   self)
 
-            else:
-                if print_level(prtl, PrtLvl.Concise):
-                    if i < 5:
-                        print (f' creating S turtle')
+    def restore_agents(self, A, G=None):
+        """G: the graph of the model, rebuilt from the checkpoint if None. Given,
+        it is taken over by the restored model (its nodes get the restored turtles).
 
-                a = NXTurtle(i,  'S',
-                                   ti * ticks_per_day,
-                                   tr * ticks_per_day, p,
-                                   self)
+        """
+        if G is None:
+            G = graph_from_adjacency(A['nodes'], A['indptr'], A['indices'])
+        self.grid     = NetworkGrid(G)
+        self.schedule = StateActivation(self, active=(INFECTED,))
+        for t in self.restore_turtles(NXTurtle, A, A['pos'].tolist()):
+            self.grid.place_agent(t, t.pos)
 
-            self.schedule.add(a)              # add to schedule
-            self.grid.place_agent(a, i)       # added to grid
 
-        self.running = True
-        self.datacollector.collect(self)
+    def place_turtles(self, turtles):
+        schedule, grid = self.schedule, self.grid
+        for a in turtles:
+            schedule.add(a)                # add to schedule
+            grid.place_agent(a, a.pos)     # added to grid (node)
 
 
 class TurtleBase(Agent):
     '''
     Base Class for a turtle
 
+    The state of the turtle is an integer code (SUSCEPTIBLE, EXPOSED, INFECTED,
+    RECOVERED, see utils) and the letter 'S', 'E', 'I', 'R' is available as the
+    (read only) attribute kind, e.g, for the portrayals of the server.
+
+    The turtle attributes are declared in __slots__. This saves little: Mesa's
+    Agent has no __slots__, so each turtle still carries a __dict__ (unique_id,
+    model, pos), and the slots hold boxed python ints and floats. Measured with
+    sys.getsizeof, a turtle and its dict take 216 bytes (224 without the slots,
+    208 in the original model, which had no stream). With tracemalloc, a
+    BarrioTortugaSEIR model of 20000 turtles on 40 x 40 takes about 550 bytes per
+    turtle (445 originally: the index of susceptibles per cell and the buckets of
+    the scheduler cost more than the slots save). For large runs use the array
+    engines (BarrioTortugaArray), which need 41 bytes per turtle.
+
     '''
+    __slots__ = ('state', 'p', 'ti', 'tr', 'il', 'iil', 'iel', 'stream')
 
-    def __init__(self, unique_id, kind, ti, tr, prob, model):
+    def __init__(self, unique_id, state, ti, tr, prob, model):
         super().__init__(unique_id, model)
 
-        self.p    = prob
-        self.kind = kind
-        self.ti   = ti           # equals model average for now throw dist later
-        self.tr   = tr           # equals model average for now throw dist later
-        self.il   = 0            # counter tick
-        self.iil  = 0           # infection length
-        self.iel  = 0           # infection length
+        self.p     = prob
+        self.state = state
+        model.counts[state] += 1
+        self.ti    = ti           # equals model average for now throw dist later
+        self.tr    = tr           # equals model average for now throw dist later
+        self.il    = 0            # ticks spent active (infected, see infection_step)
+        self.iil   = 0           # infection length
+        self.iel   = 0           # infection length
+        self.stream = model.stream  # dice and moves (see use_agent_streams)
+
+        if state == INFECTED:     # infected since tick 0
+            model.calendar.schedule(due_tick(self.iil, self.tr), self, RECOVERED)
+
+
+    @property
+    def kind(self):
+        return KINDS[self.state]
+
+
+    @classmethod
+    def restore(cls, model, pos, unique_id, state, p, ti, tr, il, iil, iel):
+        """A turtle with the given attributes, from a checkpoint. Unlike the
+        constructor, it does not count the turtle nor book its changes of state.
+
+        """
+        turtle = cls.__new__(cls)
+        Agent.__init__(turtle, unique_id, model)
+        turtle.pos    = pos
+        turtle.state  = state
+        turtle.p      = p
+        turtle.ti     = ti
+        turtle.tr     = tr
+        turtle.il     = il
+        turtle.iil    = iil
+        turtle.iel    = iel
+        turtle.stream = model.stream
+        return turtle
 
 
     def infection_step(self):
-        self.il+=1
-
-        # Turtle became exposed with tag self.iel (see infect ())
-        if self.kind == 'E' :
-
-            if print_level(prtl, PrtLvl.Detailed):
-                    print(f"""Found exposed with tag = {self.iel}
-                          global time = {self.model.schedule.steps}
-                          turtle id   = {self.unique_id}
-                """)
-
-            # When time is larger than incubation time, become infected
-            if self.model.schedule.steps - self.iel > self.ti :
-                self.iil = self.model.schedule.steps
-                self.kind = 'I'
+        """The changes E --> I and I --> R are scheduled in the calendar of the model
+        (see become_exposed and become_infected), thus here only infected turtles
+        have something to do, and only they are activated: il counts the ticks a
+        turtle spends active (infected).
 
-                if print_level(prtl, PrtLvl.Detailed):
-                    print(f"""Turning E into I with tag = {self.iil}
-                          global time = {self.model.schedule.steps}
-                          turtle id   = {self.unique_id}
-                """)
+        """
+        self.il+=1
 
-        elif self.kind == 'I':
+        if self.state == INFECTED:
             if print_level(prtl, PrtLvl.Detailed):
                 print(f"""Found Infected with tag = {self.iil}
                           global time = {self.model.schedule.steps}
@@ -409,16 +721,6 @@ class TurtleBase(Agent):
 
             self.infect()
 
-            # When time is larger than recovery time, become recovered
-            if self.model.schedule.steps - self.iil >  self.tr :
-                self.kind = 'R'
-
-                if print_level(prtl, PrtLvl.Detailed):
-                    print(f"""Turning I into R with tag = {self.iil}
-                          global time = {self.model.schedule.steps}
-                          turtle id   = {self.unique_id}
-                """)
-
 
     def infect(self):
         pass
@@ -428,9 +730,8 @@ class TurtleBase(Agent):
         if print_level(prtl, PrtLvl.Verbose):
             print(f' throwing dice')
 
-        if throw_dice(self.p):
-            turtle.kind = 'E'
-            turtle.iel = self.model.schedule.steps # tag = infection time
+        if self.stream.throw_dice(self.p):
+            turtle.become_exposed()
 
             if print_level(prtl, PrtLvl.Detailed):
                 print(f' **TURNING TURTLE INTO E ** ')
@@ -442,6 +743,47 @@ class TurtleBase(Agent):
                 """)
 
 
+    def set_state(self, state):
+        """Changes the state of the turtle, keeping the counters of the model"""
+        counts = self.model.counts
+        counts[self.state] -= 1
+        counts[state]      += 1
+        self.model.schedule.change_state(self, self.state, state)
+        self.state = state
+
+
+    def become_exposed(self):
+        self.set_state(EXPOSED)
+        self.iel = self.model.schedule.steps # tag = infection time
+
+        # When time is larger than incubation time, become infected
+        self.model.calendar.schedule(due_tick(self.iel, self.ti), self, INFECTED)
+
+
+    def become_infected(self, tick):
+        self.iil = tick
+        self.set_state(INFECTED)
+
+        # When time is larger than recovery time, become recovered
+        self.model.calendar.schedule(due_tick(self.iil, self.tr), self, RECOVERED)
+
+        if print_level(prtl, PrtLvl.Detailed):
+            print(f"""Turning E into I with tag = {self.iil}
+                      global time = {tick}
+                      turtle id   = {self.unique_id}
+            """)
+
+
+    def become_recovered(self, tick):
+        self.set_state(RECOVERED)
+
+        if print_level(prtl, PrtLvl.Detailed):
+            print(f"""Turning I into R with tag = {self.iil}
+                      global time = {tick}
+                      turtle id   = {self.unique_id}
+            """)
+
+
     def print_infection_banner(self):
         print(f"""Now infecting with tags  {self.iil}
                   global time = {self.model.schedule.steps}
@@ -456,18 +798,25 @@ class SeirTurtle(TurtleBase):
 
     '''
 
-    def __init__(self, unique_id, pos, kind, ti, tr, prob, model):
+    __slots__ = ()
+
+    def __init__(self, unique_id, pos, state, ti, tr, prob, model):
         '''
         grid: The MultiGrid object in which the agent lives.
         x: The agent's current x coordinate
         y: The agent's current y coordinate
         stochastic: If false mean average
         '''
-        super().__init__(unique_id, kind, ti, tr, prob, model)
+        super().__init__(unique_id, state, ti, tr, prob, model)
         self.pos  = pos
 
 
     def step(self):
+        '''
+        Full step of the turtle, as run by a RandomActivation scheduler.
+        The model scheduler (StateActivation) runs instead infection_step for
+        the infected turtles and then random_move for all.
+        '''
         self.infection_step()
         self.random_move()
 
@@ -476,44 +825,36 @@ class SeirTurtle(TurtleBase):
         if print_level(prtl, PrtLvl.Verbose):
             self.print_infection_banner()
 
-        # array of coordinates ((x0,y0), (x1,y1), (x2, y2),...) of neighbors
-        # last parameter True inludes own cell
-        n_xy = self.model.grid.get_neighborhood(self.pos, self.model.moore, True)
+        # susceptibles in the neighborhood (own cell included), from the index
+        # of the model, which already wraps the coordinates around the torus
+        turtles = self.model.cells.susceptibles_near(self.pos)
 
         if print_level(prtl, PrtLvl.Verbose):
-                print(f'coordinates of neighbors, including me = {n_xy}')
-
-        for xy in n_xy:   # loops over all cells
-            if print_level(prtl, PrtLvl.Verbose):
-                    print(f'neighbors = {xy}')
+            print(f' number of susceptible turtles in neighborhood = {len(turtles)}')
 
-            cell = self.model.grid.get_cell_list_contents(xy)
-            turtles = [obj for obj in cell if isinstance(obj, type(self))]
+        for turtle in turtles:  # try to infect each susceptible
+            self.turning_into_exposed(turtle)
 
-            if print_level(prtl, PrtLvl.Verbose):
-                print(f' number of turtles = {len(turtles)}')
-
-            for turtle in turtles:  # loops over all turtles in cells
 
-                if print_level(prtl, PrtLvl.Verbose):
-                    print(f' turtle kind = {turtle.kind}')
-
-                if turtle.kind == 'S':  # if susceptible found try to infect
-                    self.turning_into_exposed(turtle)
+    def become_exposed(self):
+        self.model.cells.remove(self, self.pos)  # no longer susceptible
+        super().become_exposed()
 
 
     def random_move(self):
         '''
         Step one cell in any allowable direction.
-        We use grid’s built-in get_neighborhood method, which returns all the neighbors of a given cell.
-        This method can get two types of cell neighborhoods: Moore (including diagonals),
-        and Von Neumann (only up/down/left/right).
-        It also needs an argument as to whether to include the center cell itself as one of the neighbors.
+        The cells of the neighborhood (Moore, own cell included) are read from the
+        table precomputed by the model index (self.model.cells), rather than
+        recomputed by the grid's get_neighborhood method at each move.
+        A susceptible turtle moves also its entry in the index.
         '''
-        # Pick the next cell from the adjacent cells.
-        next_moves = self.model.grid.get_neighborhood(self.pos, self.model.moore, True)
-        next_move = self.random.choice(next_moves)
+        # Pick the next cell from the adjacent cells (precomputed by the index).
+        next_moves = self.model.cells.neighborhood[self.pos]
+        next_move = next_moves[int(self.stream.random() * len(next_moves))]
         # Now move:
+        if self.state == SUSCEPTIBLE:
+            self.model.cells.move(self, self.pos, next_move)
         self.model.grid.move_agent(self, next_move)
 
 
@@ -523,14 +864,16 @@ class NXTurtle(TurtleBase):
 
     '''
 
-    def __init__(self, unique_id, kind, ti, tr, prob, model):
+    __slots__ = ()
+
+    def __init__(self, unique_id, state, ti, tr, prob, model):
         '''
         grid: The MultiGrid object in which the agent lives.
         x: The agent's current x coordinate
         y: The agent's current y coordinate
         stochastic: If false mean average
         '''
-        super().__init__(unique_id, kind, ti, tr, prob, model)
+        super().__init__(unique_id, state, ti, tr, prob, model)
         self.pos   = unique_id   # node
 
 
@@ -554,5 +897,5 @@ class NXTurtle(TurtleBase):
             if print_level(prtl, PrtLvl.Verbose):
                 print(f' turtle kind = {turtle.kind}')
 
-            if turtle.kind == 'S':  # if susceptible found try to infect
+            if turtle.state == SUSCEPTIBLE:  # if susceptible found try to infect
                 self.turning_into_exposed(turtle)
@@ -17,13 +17,14 @@ A turtle which has a hot spot patch as a neighbour has a probability ph to stay
  (pp, larger than ph) then goes around through the blue patches to exit.
 """
 
-from mesa import Model
 from mesa.space import MultiGrid
-from mesa.datacollection import DataCollector
 from mesa import Agent
 from mesa.time import RandomActivation
 import numpy as np
 
+from . rng import SeededModel
+from . collector import ArrayCollector
+
 from enum import Enum
 class PrtLvl(Enum):
     Mute     = 1
@@ -96,19 +97,11 @@ class Turtle(Agent):
 
 
     def avoid_turtle(self):
-        atry =  np.random.random_sample() # check awareness
-        if atry < self.model.avoid_awareness:
-            return True
-        else:
-            return False
+        return self.model.stream.throw_dice(self.model.avoid_awareness) # check awareness
 
 
     def socialize_turtle(self):
-        atry =  np.random.random_sample() # check awareness
-        if atry < self.model.social_affinity:
-            return True
-        else:
-            return False
+        return self.model.stream.throw_dice(self.model.social_affinity) # check awareness
 
 
     def filled_with_turtles(self, cell):
@@ -192,7 +185,7 @@ def number_of_turtles_in_neighborhood(model):
 
     return nc
 
-class BarrioTortuga(Model):
+class BarrioTortuga(SeededModel):
     '''
     A neighborhood where turtles goes out of their homes, walk around at random
     and meet other turtles.
@@ -204,7 +197,10 @@ class BarrioTortuga(Model):
                  turtles=250,
                  social_affinity = 0.,
                  nd=2,
-                 prtl=PrtLvl.Detailed):
+                 prtl=PrtLvl.Detailed,
+                 seed=None,
+                 collect_every=1,
+                 spill=None):
         '''
         Create a new Barrio Tortuga.
 
@@ -228,12 +224,16 @@ class BarrioTortuga(Model):
             always moves to its cell. A social affinity of -1 means that a turtle always tries
             to avoid any turtle nearby.
             nd, a parameter that decides the number of doors (largest for nd=1)
+            seed, the seed of the random streams of the model (see rng.SeededModel)
+            collect_every, spill: collect the encounters every collect_every ticks,
+            writing them in chunks to directory spill if given (see collector.ArrayCollector)
         '''
 
         # read the map
         self.map_bt                 = np.genfromtxt(map_file)
         self.social_affinity        = social_affinity
         self.avoid_awareness        = -social_affinity
+        self.seed_streams(seed)                       # rng, stream (dice) and random
 
         if print_level(prtl, PrtLvl.Concise):
             print(f'loaded barrio tortuga map with dimensions ->{ self.map_bt.shape}')
@@ -248,8 +248,10 @@ class BarrioTortuga(Model):
         self.moore                  = True
         self.turtles                = turtles
         self.schedule               = RandomActivation(self)
-        self.datacollector          = DataCollector(
-        model_reporters             = {"NumberOfEncounters": number_of_encounters}
+        self.datacollector          = ArrayCollector(
+        model_reporters             = {"NumberOfEncounters": number_of_encounters},
+        every                       = collect_every,
+        spill                       = spill
         )
 
         # create the patches representing houses and avenues
@@ -0,0 +1,222 @@
+"""
+Online statistics of an ensemble, fed one replica at a time.
+
+The aggregator keeps, for every tick and compartment, the running mean and
+variance (Welford), minimum and maximum, and P^2 estimates (Jain & Chlamtac, 1985)
+of a few quantiles. Its memory depends on the number of ticks and compartments,
+not on the number of replicas. All the statistics are updated with whole-array
+operations over the (tick x compartment) grid.
+
+OutputIntervals does the same for a few scalar outputs of each replica (peak
+time and height, attack rate), with confidence intervals to decide when an
+ensemble has enough replicas (see ensemble.run_adaptive).
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.stats import t
+
+from . store import SEIR_COLUMNS
+from . analysis import peak_position
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+class P2Quantiles:
+    """P^2 estimators of the quantiles probs of each cell of an array of shape.
+
+    Each estimator keeps 5 markers (heights q, positions n): the minimum, the
+    quantiles p/2, p, (1+p)/2 and the maximum, adjusted after each observation with
+    a parabolic (or linear) interpolation. The first 5 observations are kept
+    and the quantiles computed exactly.
+
+    """
+
+    def __init__(self, shape, probs=QUANTILES):
+        p           = np.asarray(probs, dtype=np.float64)[:, None]
+        self.probs  = tuple(probs)
+        self.count  = 0
+        self.first  = []
+        self.q      = np.zeros((len(p), 5) + tuple(shape))           # heights
+        self.n      = np.zeros((len(p), 5) + tuple(shape))           # positions
+        self.want   = np.hstack([np.ones_like(p), 1 + 2 * p, 1 + 4 * p, 3 + 2 * p,
+                                 5 * np.ones_like(p)])                # desired positions
+        self.dwant  = np.hstack([np.zeros_like(p), p / 2, p, (1 + p) / 2,
+                                 np.ones_like(p)])
+
+
+    def add(self, x):
+        self.count += 1
+        if self.count <= 5:
+            self.first.append(np.array(x, dtype=np.float64))
+            if self.count == 5:
+                self.q[:] = np.sort(np.stack(self.first), axis=0)
+                self.n[:] = np.arange(1, 6).reshape((1, 5) + (1,) * x.ndim)
+                self.first = []
+            return
+
+        q, n = self.q, self.n
+        q[:, 0] = np.minimum(q[:, 0], x)
+        q[:, 4] = np.maximum(q[:, 4], x)
+        k = np.minimum((q[:, 1:4] <= x).sum(axis=1), 3)             # cell of x
+        for i in range(1, 5):
+            n[:, i] += i > k
+        self.want += self.dwant
+
+        want = self.want.reshape(self.want.shape + (1,) * x.ndim)
+        for i in (1, 2, 3):
+            d    = want[:, i] - n[:, i]
+            move = (((d >= 1) & (n[:, i + 1] - n[:, i] > 1)) |
+                    ((d <= -1) & (n[:, i - 1] - n[:, i] < -1)))
+            if not move.any():
+                continue
+            d = np.sign(d) * move
+            qp = q[:, i] + d / (n[:, i + 1] - n[:, i - 1]) * (
+                 (n[:, i] - n[:, i - 1] + d) * (q[:, i + 1] - q[:, i]) / (n[:, i + 1] - n[:, i]) +
+                 (n[:, i + 1] - n[:, i] - d) * (q[:, i] - q[:, i - 1]) / (n[:, i] - n[:, i - 1]))
+            ok  = (q[:, i - 1] < qp) & (qp < q[:, i + 1])
+            nxt = np.where(d > 0, q[:, i + 1], q[:, i - 1])
+            dn  = np.where(d > 0, n[:, i + 1], n[:, i - 1]) - n[:, i]
+            ql  = q[:, i] + d * (nxt - q[:, i]) / np.where(dn == 0, 1, dn)
+            q[:, i] = np.where(move, np.where(ok, qp, ql), q[:, i])
+            n[:, i] += d
+
+
+    def quantiles(self):
+        """Array (probs x shape) of the estimates"""
+        if self.count < 5:
+            return np.quantile(np.stack(self.first), self.probs, axis=0)
+        return self.q[:, 2].copy()
+
+
+class EnsembleAggregator:
+    """Running statistics, per tick and compartment, of the time series of the
+    replicas of an ensemble (the data frames of run_model, with steps + 1 rows).
+
+    """
+
+    def __init__(self, columns=SEIR_COLUMNS, probs=QUANTILES):
+        self.columns = list(columns)
+        self.probs   = probs
+        self.count   = 0
+
+
+    def add(self, dft):
+        x = dft[self.columns].to_numpy(dtype=np.float64)
+        if self.count == 0:
+            self.index = dft.index
+            self.mu    = np.zeros_like(x)
+            self.m2    = np.zeros_like(x)
+            self.lo    = x.copy()
+            self.hi    = x.copy()
+            self.p2    = P2Quantiles(x.shape, self.probs)
+
+        self.count += 1
+        delta    = x - self.mu
+        self.mu += delta / self.count
+        self.m2 += delta * (x - self.mu)
+        np.minimum(self.lo, x, out=self.lo)
+        np.maximum(self.hi, x, out=self.hi)
+        self.p2.add(x)
+
+
+    def frame(self, values):
+        return pd.DataFrame(values, index=self.index, columns=self.columns)
+
+
+    def mean(self):
+        return self.frame(self.mu)
+
+
+    def var(self):
+        """Sample variance (ddof = 1)"""
+        return self.frame(self.m2 / max(self.count - 1, 1))
+
+
+    def std(self):
+        return np.sqrt(self.var())
+
+
+    def min(self):
+        return self.frame(self.lo)
+
+
+    def max(self):
+        return self.frame(self.hi)
+
+
+    def quantile(self, p):
+        return self.frame(self.p2.quantiles()[self.probs.index(p)])
+
+
+    def bands(self, column='NumberOfInfected'):
+        """Fan chart of column: a data frame with the mean, std, min, max and the
+        quantiles (columns named by probability) per tick.
+
+        """
+        j  = self.columns.index(column)
+        df = pd.DataFrame({'mean': self.mu[:, j],
+                           'std' : self.std().to_numpy()[:, j],
+                           'min' : self.lo[:, j],
+                           'max' : self.hi[:, j]}, index=self.index)
+        for p, q in zip(self.probs, self.p2.quantiles()):
+            df[p] = q[:, j]
+        return df
+
+
+def attack_rate(dft):
+    """Fraction of the turtles infected at the end of the run"""
+    first = dft.iloc[0]
+    return dft.NumberOfRecovered.iloc[-1] / first[list(SEIR_COLUMNS)].sum()
+
+
+OUTPUTS = {'peak_time'   : lambda dft: peak_position(dft)[0],     # in ticks
+           'peak_height' : lambda dft: peak_position(dft)[1],
+           'attack_rate' : attack_rate}
+
+
+class OutputIntervals:
+    """Running mean and confidence interval (Student t) of scalar outputs of the
+    replicas of an ensemble (dict name -> function of the data frame of a run).
+
+    """
+
+    def __init__(self, outputs=OUTPUTS, confidence=0.95):
+        self.outputs    = dict(outputs)
+        self.confidence = confidence
+        self.count      = 0
+        self.mu         = np.zeros(len(self.outputs))
+        self.m2         = np.zeros(len(self.outputs))
+
+
+    def add(self, dft):
+        x = np.array([f(dft) for f in self.outputs.values()], dtype=np.float64)
+        self.count += 1
+        delta    = x - self.mu
+        self.mu += delta / self.count
+        self.m2 += delta * (x - self.mu)
+
+
+    def halfwidth(self):
+        """Half width of the confidence intervals of the means (inf below 2 replicas)"""
+        if self.count < 2:
+            return np.full(len(self.outputs), np.inf)
+        s = np.sqrt(self.m2 / (self.count - 1))
+        return t.ppf((1 + self.confidence) / 2, self.count - 1) * s / np.sqrt(self.count)
+
+
+    def converged(self, tolerances, relative=False):
+        """True if the half width of each output in tolerances (dict name -> tol) is
+        below its tolerance (a fraction of the |mean| if relative).
+
+        """
+        hw = dict(zip(self.outputs, self.halfwidth()))
+        mu = dict(zip(self.outputs, self.mu))
+        return all(hw[k] <= (tol * abs(mu[k]) if relative else tol)
+                   for k, tol in tolerances.items())
+
+
+    def frame(self):
+        """Data frame of the mean and half width of each output"""
+        return pd.DataFrame({'mean': self.mu, 'halfwidth': self.halfwidth()},
+                            index=list(self.outputs))
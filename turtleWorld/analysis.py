@@ -106,6 +106,29 @@ def plot_compar_I(path, DIRS, LBLS, T='Comparison', figsize=(12,12)):
     plt.title(T)
     plt.legend()
 
+def plot_fan(agg, column='NumberOfInfected', ticks_per_day=5,
+             T='Infected: R0 = 3.5, ti = 5.5, tr = 5', figsize=(8,8)):
+    """Fan chart of an ensemble (see aggregate.EnsembleAggregator): the mean and
+    the bands between the outer and inner quantiles.
+
+    """
+    fig = plt.figure(figsize=figsize)
+    ax=plt.subplot(111)
+
+    df = agg.bands(column)
+    t  = df.index / ticks_per_day
+    probs = sorted(agg.probs)
+    for j in range(len(probs) // 2):
+        plt.fill_between(t, df[probs[j]], df[probs[-1 - j]], color='r', alpha=0.2,
+                         label=f'{probs[j]:.0%} - {probs[-1 - j]:.0%}')
+    plt.plot(t, df['mean'], 'r', lw=2, label='mean')
+
+    plt.xlabel('time (days)')
+    plt.ylabel(column)
+    plt.legend()
+    plt.title(T)
+    plt.show()
+
 # def plot_runs_I(DFD, F=True, S=True, P=True,
 #                 T='Infected: R0 = 3.5, ti = 5.5, tr = 5', figsize=(8,8)):
 #     fig = plt.figure(figsize=figsize)
@@ -0,0 +1,230 @@
+"""
+A persistent cache of runs.
+
+A run is determined by the model (class or factory), its parameters, the number
+of steps, the seed and the code of the package. The key of a run is the SHA-256 of
+a canonical JSON document of these (the code enters as a hash of the sources of
+turtleWorld, so that any change of the code invalidates the cache). Runs without
+a seed (fresh entropy) are not reproducible, thus not cached.
+
+Each run is a .npz file (time series and turtle parameters) named by its key.
+Reading a run touches its file: when the cache grows beyond max_bytes the least
+recently used runs are removed.
+
+GraphCache keeps the networks of the network models, keyed by (generator,
+turtles, k, seed): a directory per graph with its nodes, CSR adjacency and
+degrees as .npy files, read back as memory maps. The replicas of an ensemble
+that share a graph (and the workers running them) map the same pages instead of
+building or unpickling their own copy.
+"""
+
+import os
+import glob
+import json
+import hashlib
+import shutil
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+
+from . rng import seed_sequence
+from . utils import PrtLvl, print_level
+from . networks import (build_ed_network, build_ba_network, er_csr, ba_csr,
+                        adjacency_arrays, graph_from_adjacency, degree_array)
+
+prtl=PrtLvl.Concise
+
+PACKAGE = os.path.dirname(os.path.abspath(__file__))
+
+_code_version = None
+
+
+def code_version():
+    """Hash of the sources of the package (computed once)"""
+    global _code_version
+    if _code_version is None:
+        h = hashlib.sha256()
+        for path in sorted(glob.glob(os.path.join(PACKAGE, '*.py'))):
+            h.update(os.path.basename(path).encode())
+            with open(path, 'rb') as f:
+                h.update(f.read())
+        _code_version = h.hexdigest()
+    return _code_version
+
+
+def run_key(factory, params, steps, seed):
+    """Key of a run (see module doc), None if seed is None"""
+    if seed is None:
+        return None
+    ss  = seed_sequence(seed)
+    doc = dict(model   = f'{factory.__module__}:{factory.__qualname__}',
+               params  = params,
+               steps   = steps,
+               seed    = [ss.entropy, list(ss.spawn_key)],
+               version = code_version())
+    return hash_document(doc)
+
+
+def hash_document(doc):
+    """SHA-256 of the canonical JSON of doc"""
+    text = json.dumps(doc, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class RunCache:
+    """Cache of runs in directory path, of at most max_bytes"""
+
+    def __init__(self, path, max_bytes=2**30):
+        self.path      = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+
+
+    def file(self, key):
+        return os.path.join(self.path, f'{key}.npz')
+
+
+    def __contains__(self, key):
+        return key is not None and os.path.isfile(self.file(key))
+
+
+    def get(self, key):
+        """(dft, stats) of the run key, or None"""
+        if key is None:
+            return None
+        path = self.file(key)
+        try:
+            with np.load(path) as f:
+                dft   = pd.DataFrame(f['series'], index=f['ticks'], columns=f['columns'].tolist())
+                stats = pd.DataFrame({name: f[name] for name in f['agent_columns'].tolist()})
+            os.utime(path)              # recently used
+        except FileNotFoundError:
+            return None
+        return dft, stats
+
+
+    def put(self, key, dft, stats):
+        if key is None:
+            return
+        path = self.file(key)
+        tmp  = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(f, series=dft.to_numpy(), ticks=dft.index.to_numpy(),
+                     columns=np.array(dft.columns, dtype=str),
+                     agent_columns=np.array(stats.columns, dtype=str),
+                     **{name: stats[name].to_numpy() for name in stats.columns})
+        os.replace(tmp, path)
+        self.evict()
+
+
+    def evict(self):
+        """Removes the least recently used runs until the cache fits in max_bytes"""
+        entries = []
+        for path in glob.glob(os.path.join(self.path, '*.npz')):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+    def size(self):
+        return sum(os.path.getsize(p) for p in glob.glob(os.path.join(self.path, '*.npz')))
+
+
+GRAPH_ARRAYS = ('nodes', 'indptr', 'indices', 'degree')
+
+
+def graph_key(generator, turtles, k, seed):
+    """Key of a graph: generator ER or BA (CSR generators of networks), nx-ER or
+    nx-BA (networkx), the number of nodes, k and the seed (int or SeedSequence)
+
+    """
+    ss = seed_sequence(seed)
+    return hash_document(dict(generator = generator,
+                              turtles   = turtles,
+                              k         = k,
+                              seed      = [ss.entropy, list(ss.spawn_key)]))
+
+
+def make_graph(generator, turtles, k, seed):
+    """The arrays (GRAPH_ARRAYS) of a new graph"""
+    if generator.startswith('nx-'):
+        build   = build_ed_network if generator == 'nx-ER' else build_ba_network
+        G, _    = build(turtles, k, seed)
+        nodes, indptr, indices = adjacency_arrays(G)
+        degree  = degree_array(G)
+    else:
+        build   = er_csr if generator == 'ER' else ba_csr
+        indptr, indices, degree = build(turtles, k, seed)
+        nodes   = np.arange(turtles)
+    return dict(nodes=nodes, indptr=indptr, indices=indices, degree=degree)
+
+
+def network_from_arrays(A, engine='mesa'):
+    """(G, mean degree) as build_ed_network and build_ba_network for the Mesa
+    engine, or as build_er_csr and build_ba_csr (G the CSR arrays) for the array
+    engine, from the arrays A of a graph. The networkx graph is rebuilt identical
+    (also in the order of the neighbors) to the one generated.
+
+    """
+    n = np.mean(A['degree'])
+    if print_level(prtl, PrtLvl.Concise):
+        print(f' mean number of neighbors ={n}')
+    if engine == 'array':
+        return (A['indptr'], A['indices']), n
+    return graph_from_adjacency(A['nodes'], A['indptr'], A['indices']), n
+
+
+class GraphCache:
+    """Cache of graphs in directory path (see module doc)"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+
+    def load(self, key):
+        """dict of the arrays of graph key, memory mapped (read only), or None"""
+        gdir = os.path.join(self.path, key)
+        if not os.path.isdir(gdir):
+            return None
+        return {name: open_memmap(os.path.join(gdir, f'{name}.npy'), mode='r')
+                for name in GRAPH_ARRAYS}
+
+
+    def save(self, key, arrays):
+        """Writes the graph to a temporary directory renamed to its key: a graph
+        in the cache is always complete, and if two processes build the same
+        graph the first one to finish keeps it.
+
+        """
+        gdir = os.path.join(self.path, key)
+        tmp  = f'{gdir}.{os.getpid()}.tmp'
+        os.makedirs(tmp, exist_ok=True)
+        for name in GRAPH_ARRAYS:
+            np.save(os.path.join(tmp, f'{name}.npy'), arrays[name])
+        try:
+            os.rename(tmp, gdir)
+        except OSError:              # already there
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+    def arrays(self, generator, turtles, k, seed):
+        """The arrays of the graph, built and saved if not in the cache"""
+        key = graph_key(generator, turtles, k, seed)
+        A   = self.load(key)
+        if A is None:
+            self.save(key, make_graph(generator, turtles, k, seed))
+            A = self.load(key)
+        return A
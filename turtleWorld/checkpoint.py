@@ -0,0 +1,121 @@
+"""
+Checkpoints of the models.
+
+A checkpoint is a single .npz file: the arrays of the model (turtle attributes,
+positions, calendar, random stream buffers, collected data) are stored as NumPy
+arrays and the rest (parameters, counters, states of the random generators) as a
+JSON document, saved in the same file. Nothing is pickled: a checkpoint does not
+depend on the classes of Mesa, and reading it back is a handful of array reads.
+
+The models build the state to save as a (nested) dict, see
+BarrioTortugaBase.checkpoint_state. Here the dict is split between the arrays and
+the JSON document, and put back together. The same state, kept in memory, is the
+snapshot from which fork makes the branches of a run.
+"""
+
+import json
+import numpy as np
+
+from mesa import Model
+
+BIG = 64            # arrays larger than this go to the npz, smaller ones to the JSON
+
+
+def encode(obj, arrays, key):
+    if isinstance(obj, dict):
+        return {k: encode(v, arrays, f'{key}/{k}') for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [encode(v, arrays, f'{key}/{i}') for i, v in enumerate(obj)]
+    if isinstance(obj, np.ndarray):
+        if obj.size > BIG:
+            arrays[key] = obj
+            return {'__npz__': key}
+        return {'__array__': obj.tolist(), 'dtype': str(obj.dtype)}
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def decode(obj, npz):
+    if isinstance(obj, dict):
+        if '__npz__' in obj:
+            return npz[obj['__npz__']]
+        if '__array__' in obj:
+            return np.array(obj['__array__'], dtype=obj['dtype'])
+        return {k: decode(v, npz) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [decode(v, npz) for v in obj]
+    return obj
+
+
+def write_checkpoint(path, state):
+    """Writes the dict state to the npz file path"""
+    arrays = {}
+    doc    = json.dumps(encode(state, arrays, ''))
+    with open(path, 'wb') as f:
+        np.savez(f, checkpoint=np.array(doc), **arrays)
+
+
+def read_checkpoint(path):
+    """The dict written by write_checkpoint"""
+    with np.load(path) as npz:
+        return decode(json.loads(str(npz['checkpoint'])), npz)
+
+
+def is_attribute(value):
+    """True for the (plain) attributes of a model saved as such"""
+    if isinstance(value, (bool, int, float, str, type(None), np.generic, np.ndarray)):
+        return True
+    if isinstance(value, list):
+        return all(isinstance(v, (bool, int, float, str)) for v in value)
+    return False
+
+
+def copy_attribute(value):
+    if isinstance(value, (list, np.ndarray)):
+        return value.copy()
+    return value
+
+
+def model_attributes(model):
+    """The plain attributes (parameters, counters, arrays) of model"""
+    return {k: copy_attribute(v) for k, v in vars(model).items() if is_attribute(v)}
+
+
+def new_model(cls, attributes, random_state, seed=None):
+    """A model of class cls with the given attributes and random state (or new
+    streams from seed if not None), without running its constructor. The caller
+    completes it (schedule, grid, agents).
+
+    """
+    model = cls.__new__(cls)
+    Model.__init__(model)
+    for k, v in attributes.items():
+        setattr(model, k, copy_attribute(v))
+    model.set_random_state(random_state)
+    if seed is not None:
+        model.seed_streams(seed)
+    return model
+
+
+def fork(model, variants=1, seed=None):
+    """Branches of model in its current state (see BarrioTortugaBase.fork). The
+    branches are built from a single in-memory snapshot (checkpoint_state).
+
+    """
+    if isinstance(variants, int):
+        variants = [{}] * variants
+
+    state = model.checkpoint_state()
+    c     = state['collector']
+    if c['spill'] is not None:    # the branches keep the data collected so far in memory
+        df = model.datacollector.get_model_vars_dataframe()
+        state['collector'] = dict(c, spill=None, chunks=0,
+                                  ticks=df.index.to_numpy(), values=df.to_numpy())
+
+    branches = []
+    for branch_seed, changes in zip(model.branch_seeds(len(variants), seed), variants):
+        branch = type(model).from_state(state, seed=branch_seed)
+        branch.apply_changes(**changes)
+        branches.append(branch)
+    return branches
@@ -0,0 +1,165 @@
+"""
+A DataCollector for long runs.
+
+Mesa's DataCollector appends the value of each model reporter to a python list
+at every tick, and builds a data frame at the end. ArrayCollector writes them in a
+preallocated NumPy array of rows, optionally only every few ticks (e.g, once per
+day), and, given a spill directory, writes each full chunk of rows to disk and
+reuses the array: the memory of the run stays flat, and the chunks written
+survive a crash (see load_spill).
+
+get_model_vars_dataframe and model_vars (used by the ChartModule of the server)
+work as in Mesa.
+"""
+
+import os
+import glob
+import json
+import numpy as np
+import pandas as pd
+
+
+class ArrayCollector:
+    """Collects model_reporters (dict name -> function of the model, or name of an
+    attribute of the model) at the ticks multiple of every.
+
+        chunk : rows kept in memory. Without spill, the array grows (doubles)
+                when full, with spill it is written to disk (chunk_xxxxxx.npz)
+        spill : directory for the chunks, or None to keep all in memory
+        dtype : type of the values (the reporters of the models count turtles)
+        clear : remove the chunks found in spill (of a previous run)
+
+    """
+
+    def __init__(self, model_reporters, every=1, chunk=1024, spill=None, dtype=np.int64,
+                 clear=True):
+        self.reporters = model_reporters
+        self.names     = list(model_reporters)
+        self.every     = every
+        self.spill     = spill
+        self.values    = np.zeros((chunk, len(self.names)), dtype=dtype)
+        self.ticks     = np.zeros(chunk, dtype=np.int64)
+        self.n         = 0              # rows in memory
+        self.chunks    = 0              # chunks written to disk
+        self.last_row  = self.values[:0].copy()
+
+        if spill is not None:
+            os.makedirs(spill, exist_ok=True)
+            if clear:
+                self.remove_chunks()
+            with open(os.path.join(spill, 'columns.json'), 'w') as f:
+                json.dump(self.names, f)
+
+
+    def remove_chunks(self, first=0):
+        for f in glob.glob(os.path.join(self.spill, 'chunk_*.npz')):
+            if int(os.path.basename(f)[6:12]) >= first:
+                os.remove(f)
+
+
+    def report(self, model, reporter):
+        if isinstance(reporter, str):
+            return getattr(model, reporter)
+        return reporter(model)
+
+
+    def collect(self, model):
+        if model.schedule.steps % self.every == 0:
+            self.append(model)
+
+
+    def collect_last(self, model):
+        """Collects the state at the end of a run, if its tick is not on the grid"""
+        if model.schedule.steps % self.every != 0:
+            self.append(model)
+
+
+    def append(self, model):
+        """Adds the row of the current tick"""
+        tick = model.schedule.steps
+        if self.n == len(self.values):
+            if self.spill is None:
+                self.values = np.concatenate([self.values, np.zeros_like(self.values)])
+                self.ticks  = np.concatenate([self.ticks,  np.zeros_like(self.ticks)])
+            else:
+                self.flush()
+
+        self.ticks[self.n] = tick
+        self.values[self.n] = [self.report(model, r) for r in self.reporters.values()]
+        self.n += 1
+
+
+    def flush(self):
+        """Writes the rows in memory to a new chunk in the spill directory"""
+        if self.spill is None or self.n == 0:
+            return
+        path = os.path.join(self.spill, f'chunk_{self.chunks:06d}.npz')
+        tmp  = os.path.join(self.spill, 'chunk.tmp')
+        with open(tmp, 'wb') as f:
+            np.savez(f, ticks=self.ticks[:self.n], values=self.values[:self.n])
+        os.replace(tmp, path)           # a chunk on disk is always complete
+        self.chunks  += 1
+        self.last_row = self.values[self.n - 1:self.n].copy()
+        self.n        = 0
+
+
+    def checkpoint(self):
+        """The state of the collector: the rows in memory and the chunks written"""
+        return dict(every    = self.every,
+                    spill    = self.spill,
+                    chunks   = self.chunks,
+                    ticks    = self.ticks[:self.n].copy(),
+                    values   = self.values[:self.n].copy(),
+                    last_row = self.last_row)
+
+
+    def restore(self, state):
+        """Restores the state of checkpoint(). The chunks written after the
+        checkpoint are removed.
+
+        """
+        ncol = len(self.names)
+        n    = len(state['ticks'])
+        if n > len(self.values):
+            self.values = np.zeros((n, ncol), dtype=self.values.dtype)
+            self.ticks  = np.zeros(n, dtype=np.int64)
+        self.values[:n] = state['values'].reshape(-1, ncol)
+        self.ticks[:n]  = state['ticks']
+        self.n          = n
+        self.chunks     = state['chunks']
+        self.last_row   = state['last_row'].reshape(-1, ncol).astype(self.values.dtype)
+        if self.spill is not None:
+            self.remove_chunks(self.chunks)
+
+
+    @property
+    def model_vars(self):
+        """dict name -> list of the values in memory (the last one at least), as
+        in Mesa (python numbers, as the visualization modules serialize them)"""
+        rows = self.values[:self.n] if self.n > 0 else self.last_row
+        return {name: rows[:, j].tolist() for j, name in enumerate(self.names)}
+
+
+    def get_model_vars_dataframe(self):
+        """Data frame of all the values collected, indexed by tick"""
+        ticks, values = [self.ticks[:self.n]], [self.values[:self.n]]
+        if self.chunks > 0:
+            df = load_spill(self.spill)
+            ticks.insert(0, df.index.to_numpy())
+            values.insert(0, df.to_numpy())
+        return pd.DataFrame(np.concatenate(values), index=np.concatenate(ticks),
+                            columns=self.names)
+
+
+def load_spill(spill):
+    """Data frame of the chunks written in directory spill (e.g, by a run that crashed)"""
+    with open(os.path.join(spill, 'columns.json')) as f:
+        names = json.load(f)
+    ticks, values = [], []
+    for path in sorted(glob.glob(os.path.join(spill, 'chunk_*.npz'))):
+        with np.load(path) as chunk:
+            ticks.append(chunk['ticks'])
+            values.append(chunk['values'])
+    if not ticks:
+        return pd.DataFrame(columns=names)
+    return pd.DataFrame(np.concatenate(values), index=np.concatenate(ticks), columns=names)
@@ -0,0 +1,289 @@
+"""
+Ensembles split in work units, run by workers on any number of nodes.
+
+The queue is a spool directory in a filesystem shared by the nodes:
+
+    spool/ensemble.json   the ensemble (factory, params, steps, seed)
+    spool/todo/           units waiting for a worker
+    spool/running/        units claimed by a worker
+    spool/done/           units completed
+    spool/failed/         units that failed max_attempts times
+    spool/results/        one file per unit, with its (index, dft, stats) replicas
+
+A worker claims a unit by renaming it from todo/ to running/, which is atomic:
+only one worker can get it. While it runs the unit, the worker touches the file
+every heartbeat seconds. A unit whose file has not been touched for stale seconds
+belongs to a worker that died (or a node that went down) and is put back in todo/
+by any worker (or by status) for another attempt.
+
+The replicas of a unit get their seeds as in ensemble.run_ensemble, thus the
+results are the same as in a single node, whatever the workers that run them.
+
+On a single box, start_workers starts local processes standing in for the nodes.
+On a cluster, run in each node:
+
+    python -m turtleWorld.dispatch <spool> [workers]
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import importlib
+import threading
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+
+from . rng import seed_sequence
+from . ensemble import run_replica, mute_models
+from . utils import PrtLvl, print_level
+
+prtl=PrtLvl.Concise
+
+DIRS = ('todo', 'running', 'done', 'failed', 'results')
+
+
+def spool_dir(spool, name):
+    return os.path.join(spool, name)
+
+
+def tmp_name(path):
+    """A temporary name for path, unique among the processes of all the nodes"""
+    return f'{path}.{socket.gethostname()}-{os.getpid()}.tmp'
+
+
+def write_json(path, obj):
+    """Writes obj to path atomically (a reader never sees a partial file)"""
+    tmp = tmp_name(path)
+    with open(tmp, 'w') as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def factory_name(factory):
+    return f'{factory.__module__}:{factory.__qualname__}'
+
+
+def load_factory(name):
+    module, qualname = name.split(':')
+    obj = importlib.import_module(module)
+    for attr in qualname.split('.'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def submit(spool,
+           factory,
+           ns            = 100,
+           steps         = 500,
+           params        = None,
+           seed          = None,
+           unit_size     = 1,
+           max_attempts  = 3):
+    """Splits an ensemble of ns replicas of factory(seed=..., **params) (see
+    ensemble.run_ensemble) in units of unit_size replicas, and queues them in
+    spool. factory must be importable by the workers, params JSON serialisable.
+    Returns the number of units.
+
+    """
+    for name in DIRS:
+        os.makedirs(spool_dir(spool, name), exist_ok=True)
+
+    ss = seed_sequence(seed)       # None: fresh entropy, recorded for reproducibility
+    write_json(spool_dir(spool, 'ensemble.json'),
+               dict(factory  = factory_name(factory),
+                    params   = {} if params is None else params,
+                    steps    = steps,
+                    ns       = ns,
+                    entropy  = ss.entropy,
+                    spawn_key= list(ss.spawn_key),
+                    max_attempts = max_attempts))
+
+    units = 0
+    for first in range(0, ns, unit_size):
+        replicas = list(range(first, min(first + unit_size, ns)))
+        write_json(os.path.join(spool_dir(spool, 'todo'), f'unit_{units:06d}.json'),
+                   dict(replicas=replicas, attempts=0, errors=[]))
+        units += 1
+    return units
+
+
+def replica_seed(ensemble, i):
+    """Seed of replica i: spawn_seeds(seed, ns)[i] of the seed of the ensemble"""
+    return np.random.SeedSequence(ensemble['entropy'],
+                                  spawn_key=tuple(ensemble['spawn_key']) + (i,))
+
+
+def claim(spool):
+    """Claims a unit of the queue. Returns its path in running/, or None if
+    the queue is empty.
+
+    """
+    todo = spool_dir(spool, 'todo')
+    for name in sorted(os.listdir(todo)):
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(spool_dir(spool, 'running'), name)
+        try:
+            os.rename(os.path.join(todo, name), path)
+        except FileNotFoundError:   # claimed by another worker
+            continue
+        os.utime(path)              # the claim is the first heartbeat
+        return path
+    return None
+
+
+def requeue(spool, path, error, max_attempts):
+    """Puts the unit at path (in running/) back in todo/, or in failed/ after
+    max_attempts attempts.
+
+    """
+    name = os.path.basename(path)
+    held = f'{path}.requeue'
+    try:
+        os.rename(path, held)       # atomic: a single worker requeues the unit
+    except FileNotFoundError:
+        return
+
+    unit = read_json(held)
+    unit['attempts'] += 1
+    unit['errors'].append(error)
+    dest = 'todo' if unit['attempts'] < max_attempts else 'failed'
+    write_json(os.path.join(spool_dir(spool, dest), name), unit)
+    os.remove(held)
+
+    if print_level(prtl, PrtLvl.Concise):
+        print(f' {name}: {error}, attempt {unit["attempts"]} --> {dest}')
+
+
+def requeue_stale(spool, stale=60):
+    """Requeues the units whose worker has not given signs of life for stale seconds"""
+    ensemble = read_json(spool_dir(spool, 'ensemble.json'))
+    running  = spool_dir(spool, 'running')
+    now      = time.time()
+    for name in os.listdir(running):
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(running, name)
+        try:
+            age = now - os.path.getmtime(path)
+        except FileNotFoundError:
+            continue
+        if age > stale:
+            requeue(spool, path, f'stale for {age:.0f} s', ensemble['max_attempts'])
+
+
+def heartbeat(path, period, stop):
+    while not stop.wait(period):
+        try:
+            os.utime(path)
+        except FileNotFoundError:   # requeued meanwhile: the results will be duplicated
+            return
+
+
+def run_unit(spool, path, ensemble, heartbeat_period):
+    unit    = read_json(path)
+    factory = load_factory(ensemble['factory'])
+
+    stop   = threading.Event()
+    beater = threading.Thread(target=heartbeat, args=(path, heartbeat_period, stop),
+                              daemon=True)
+    beater.start()
+    try:
+        results = [run_replica(factory, ensemble['params'], ensemble['steps'],
+                               replica_seed(ensemble, i), i)
+                   for i in unit['replicas']]
+    finally:
+        stop.set()
+        beater.join()
+
+    name   = os.path.basename(path).replace('.json', '.pkl')
+    result = os.path.join(spool_dir(spool, 'results'), name)
+    tmp    = tmp_name(result)
+    pd.to_pickle(results, tmp)
+    os.replace(tmp, result)         # the same whoever runs the unit
+
+
+def pending(spool):
+    return any(name.endswith('.json')
+               for d in ('todo', 'running') for name in os.listdir(spool_dir(spool, d)))
+
+
+def work(spool,
+         heartbeat_period = 10,
+         stale            = 60,
+         poll             = 1,
+         worker           = None,
+         quiet            = True):
+    """Runs units of spool until there are none left to run (or running in other
+    workers). Returns the number of units run. quiet silences the models.
+
+    """
+    if quiet:
+        mute_models()
+    worker   = f'{socket.gethostname()}-{os.getpid()}' if worker is None else worker
+    ensemble = read_json(spool_dir(spool, 'ensemble.json'))
+    n        = 0
+
+    while True:
+        path = claim(spool)
+        if path is None:
+            requeue_stale(spool, stale)
+            if not pending(spool):
+                break
+            time.sleep(poll)
+            continue
+
+        try:
+            run_unit(spool, path, ensemble, heartbeat_period)
+        except Exception as error:
+            requeue(spool, path, f'{worker}: {error!r}', ensemble['max_attempts'])
+            continue
+
+        try:
+            os.rename(path, os.path.join(spool_dir(spool, 'done'), os.path.basename(path)))
+        except FileNotFoundError:   # requeued as stale meanwhile
+            pass
+        n += 1
+        if print_level(prtl, PrtLvl.Detailed):
+            print(f' {worker}: {os.path.basename(path)} done')
+    return n
+
+
+def start_workers(spool, n, **kwargs):
+    """Starts n local worker processes (standing in for nodes). Returns them"""
+    workers = [multiprocessing.Process(target=work, args=(spool,), kwargs=kwargs)
+               for i in range(n)]
+    for w in workers:
+        w.start()
+    return workers
+
+
+def status(spool, stale=60):
+    """Requeues the stale units and returns the number of units in each state"""
+    requeue_stale(spool, stale)
+    return {d: sum(name.endswith('.json') for name in os.listdir(spool_dir(spool, d)))
+            for d in ('todo', 'running', 'done', 'failed')}
+
+
+def collect(spool):
+    """Yields the (index, dft, stats) replicas completed so far"""
+    results = spool_dir(spool, 'results')
+    for name in sorted(os.listdir(results)):
+        if name.endswith('.pkl'):
+            yield from pd.read_pickle(os.path.join(results, name))
+
+
+if __name__ == '__main__':
+    spool   = sys.argv[1]
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    for w in start_workers(spool, workers):
+        w.join()
@@ -0,0 +1,304 @@
+"""
+Ensembles of replicas of the turtle models, run in a pool of processes.
+
+The replicas of an ensemble are independent: each runs in a worker process of a
+ProcessPoolExecutor, with its own seed spawned from the seed of the ensemble
+(rng.spawn_seeds), thus the i-th replica is the same whatever the number of
+workers and the order in which the replicas complete. Each worker returns only
+the time series of its replica (a few kB), so the speedup is nearly linear in the
+number of cores for ensembles much larger than the pool.
+
+run_adaptive does not fix the number of replicas: it runs them until the
+confidence intervals of a few outputs (peak time, attack rate ...) are narrow
+enough.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, Future, as_completed
+
+import pandas as pd
+
+from . rng import spawn_seeds, seed_sequence
+from . cache import run_key, GraphCache, graph_key, make_graph, network_from_arrays
+from . shared import SharedGraph
+from . aggregate import OutputIntervals
+from . utils import PrtLvl, print_level, fill_to_steps
+from . networks import build_ed_network, build_ba_network, build_er_csr, build_ba_csr
+from . import BarrioTortugaSEIR
+from . import BarrioTortugaArray
+from . import cache as cache_module
+from . import networks
+
+prtl=PrtLvl.Concise
+
+
+def graph_generator(network, engine):
+    """Name of the generator of the graph (see cache.graph_key)"""
+    return network if engine == 'array' else f'nx-{network}'
+
+
+def graph_seed_of(seed_graph, engine):
+    """The seed as taken by the generator: an int for networkx"""
+    if engine == 'array':
+        return seed_graph
+    return int(seed_sequence(seed_graph).generate_state(1)[0])
+
+
+def shared_network(network, turtles, k, graph_seed, engine='mesa', graph_cache=None):
+    """The network of nx_model(turtles, k, network, graph_seed=graph_seed,
+    engine=engine) in shared memory (shared.SharedGraph), read from graph_cache if
+    given. To be passed to the replicas as parameter graph of nx_model.
+
+    """
+    generator = graph_generator(network, engine)
+    seed      = graph_seed_of(graph_seed, engine)
+    if graph_cache is not None:
+        arrays = GraphCache(graph_cache).arrays(generator, turtles, k, seed)
+    else:
+        arrays = make_graph(generator, turtles, k, seed)
+    return SharedGraph(arrays, graph_key(generator, turtles, k, seed))
+
+
+def nx_model(turtles       = 20000,
+             k             = 0.002,
+             network       = 'ER',    # ER = random netwok BA: preferential attachment
+             seed          = None,
+             engine        = 'mesa',  # mesa: agents, array: BarrioTortugaNXArray
+             graph_seed    = None,    # fixed graph for all the replicas
+             graph_cache   = None,    # directory of a cache.GraphCache
+             graph         = None,    # shared.SharedGraph, see shared_network
+             **params):
+    """Builds a network (ER or BA) and a BarrioTortugaNX (or BarrioTortugaNXArray)
+    on it. The network and the model get independent seeds from seed, or the
+    network is built from graph_seed, thus the same for all the replicas of an
+    ensemble. To be used as model factory of an ensemble of network models.
+
+    The array engine gets the network from the CSR generators of networks
+    (er_csr, ba_csr), the Mesa engine from networkx. With a graph_cache, the
+    network is read (memory mapped) from the cache, built only the first time.
+    A graph (published once by shared_network) is used as is: the array engine
+    runs on the shared arrays, without a copy.
+
+    """
+    seed_graph, seed_model = spawn_seeds(seed, 2)
+    if graph_seed is not None:
+        seed_graph = seed_sequence(graph_seed)
+    seed_graph = graph_seed_of(seed_graph, engine)
+
+    if graph is not None:
+        G, n = network_from_arrays(graph.arrays(), engine)
+    elif graph_cache is not None:
+        A    = GraphCache(graph_cache).arrays(graph_generator(network, engine), turtles, k,
+                                              seed_graph)
+        G, n = network_from_arrays(A, engine)
+    elif engine == 'array':
+        build = build_er_csr if network == 'ER' else build_ba_csr
+        G, n  = build(turtles, k, seed_graph)
+    else:
+        build = build_ed_network if network == 'ER' else build_ba_network
+        G, n  = build(turtles, k, seed_graph)
+
+    if engine == 'array':
+        return BarrioTortugaArray.BarrioTortugaNXArray(G, n, seed=seed_model, **params)
+    return BarrioTortugaSEIR.BarrioTortugaNX(G, n, seed=seed_model, **params)
+
+
+def run_model(model, steps):
+    """Steps model up to steps times (less if the epidemic ends) and returns the
+    time series, padded to the collection grid (steps + 1 rows if collected every
+    tick, see utils.fill_to_steps), and the turtle parameters (Ti, Tr, P).
+
+    """
+    for i in range(steps):
+        model.step()
+        if not model.running:
+            break
+
+    dc    = model.datacollector
+    dft   = fill_to_steps(dc.get_model_vars_dataframe(), steps, dc.every)
+    stats = pd.DataFrame({'Ti': model.Ti, 'Tr': model.Tr, 'P': model.P})
+    return dft, stats
+
+
+def run_replica(factory, params, steps, seed, index):
+    """Runs replica index of an ensemble: factory(seed=seed, **params) for steps.
+    Returns (index, dft, stats).
+
+    """
+    model      = factory(seed=seed, **params)
+    dft, stats = run_model(model, steps)
+    return index, dft, stats
+
+
+def mute_models():
+    """Silences the models (initializer of the workers)"""
+    BarrioTortugaSEIR.prtl  = PrtLvl.Mute
+    BarrioTortugaArray.prtl = PrtLvl.Mute
+    cache_module.prtl       = PrtLvl.Mute
+    networks.prtl           = PrtLvl.Mute
+
+
+def cached_replicas(factory, ns, steps, params=None, seed=None, cache=None):
+    """Indices of the replicas of run_ensemble (same arguments) found in cache"""
+    if cache is None or seed is None:
+        return set()
+    params = {} if params is None else params
+    return {i for i, s in enumerate(spawn_seeds(seed, ns))
+            if run_key(factory, params, steps, s) in cache}
+
+
+def run_ensemble(factory,
+                 ns            = 100,
+                 steps         = 500,
+                 params        = None,
+                 seed          = None,
+                 workers       = None,
+                 quiet         = True,
+                 cache         = None):
+    """Runs ns replicas of the model built by factory(seed=..., **params)
+    (a model class, e.g, BarrioTortugaSEIRArray, or a function such as nx_model).
+
+    Yields (index, dft, stats) for each replica as soon as it completes, thus not
+    in the order of index (see run_replica). The replica index gets seed
+    spawn_seeds(seed, ns)[index], reproducible for a given seed.
+
+    workers is the number of processes (all the cores by default); with
+    workers = 1 the replicas run one after another in this process. factory and
+    params must be picklable. quiet silences the models in the workers.
+
+    With a cache (cache.RunCache) and a seed, the replicas found in the cache are
+    yielded first, and only the rest are run (and added to the cache).
+
+    """
+    params  = {} if params is None else params
+    seeds   = spawn_seeds(seed, ns)
+    workers = os.cpu_count() if workers is None else workers
+    t0      = time.time()
+
+    keys = [None] * ns
+    if cache is not None and seed is not None:
+        keys = [run_key(factory, params, steps, s) for s in seeds]
+
+    todo = []
+    for i in range(ns):
+        hit = cache.get(keys[i]) if keys[i] is not None else None
+        if hit is None:
+            todo.append(i)
+        else:
+            yield (i,) + hit
+    cached = ns - len(todo)
+
+    if print_level(prtl, PrtLvl.Concise):
+        print(f' Running ensemble of {ns} replicas of {steps} steps on {workers} workers'
+              f' ({cached} found in cache)')
+
+    def completed(result, done):
+        i, dft, stats = result
+        if keys[i] is not None:
+            cache.put(keys[i], dft, stats)
+        if print_level(prtl, PrtLvl.Concise):
+            dt  = time.time() - t0
+            eta = dt * (len(todo) - done) / done
+            print(f' replicas done: {cached + done}/{ns}, elapsed {dt:.1f} s, eta {eta:.1f} s')
+        return result
+
+    if workers == 1:
+        for done, i in enumerate(todo, 1):
+            yield completed(run_replica(factory, params, steps, seeds[i], i), done)
+        return
+
+    initializer = mute_models if quiet else None
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer) as pool:
+        futures = [pool.submit(run_replica, factory, params, steps, seeds[i], i)
+                   for i in todo]
+        for done, future in enumerate(as_completed(futures), 1):
+            yield completed(future.result(), done)
+
+
+def run_adaptive(factory,
+                 tolerances,
+                 params        = None,
+                 steps         = 500,
+                 seed          = None,
+                 workers       = None,
+                 min_ns        = 10,
+                 max_ns        = 1000,
+                 relative      = False,
+                 intervals     = None,
+                 quiet         = True,
+                 cache         = None):
+    """Runs replicas of the model built by factory(seed=..., **params) (see
+    run_ensemble) until the confidence intervals of the outputs in tolerances
+    (dict name -> tolerance on the half width, a fraction of the mean if relative)
+    are within tolerance, with at least min_ns and at most max_ns replicas.
+
+    intervals (aggregate.OutputIntervals, by default of peak time, peak height and
+    attack rate at 95%) accumulates the outputs: after the run it holds their means
+    and confidence intervals.
+
+    Yields (index, dft, stats) in the order of index. The convergence is checked
+    after each replica in that order, thus the number of replicas depends only on
+    the seed, not on the number of workers (the replicas still in flight when the
+    ensemble converges are dropped).
+
+    """
+    params    = {} if params is None else params
+    workers   = os.cpu_count() if workers is None else workers
+    intervals = OutputIntervals() if intervals is None else intervals
+    seeds     = spawn_seeds(seed, max_ns)
+    t0        = time.time()
+
+    def key(i):
+        return run_key(factory, params, steps, seeds[i]) if cache is not None and seed is not None else None
+
+    def result(i, future):
+        index, dft, stats = future.result()
+        if i not in cached and key(i) is not None:      # only the replicas run
+            cache.put(key(i), dft, stats)
+        return index, dft, stats
+
+    if print_level(prtl, PrtLvl.Concise):
+        print(f' Running adaptive ensemble of {min_ns} to {max_ns} replicas of {steps} steps'
+              f' on {workers} workers, tolerances {tolerances}')
+
+    initializer = mute_models if quiet else None
+    pool        = ProcessPoolExecutor(max_workers=workers, initializer=initializer) if workers > 1 else None
+    futures     = {}
+    cached      = set()
+    submitted   = 0
+
+    def submit():
+        nonlocal submitted
+        i, submitted = submitted, submitted + 1
+        future = Future()
+        hit = cache.get(key(i)) if key(i) is not None else None
+        if hit is not None:
+            cached.add(i)
+            future.set_result((i,) + hit)
+        elif pool is not None:
+            future = pool.submit(run_replica, factory, params, steps, seeds[i], i)
+        else:
+            future.set_result(run_replica(factory, params, steps, seeds[i], i))
+        futures[i] = future
+
+    try:
+        for i in range(max_ns):
+            while submitted < max_ns and submitted <= i + 2 * (workers - 1):
+                submit()
+            index, dft, stats = result(i, futures.pop(i))
+            intervals.add(dft)
+            yield index, dft, stats
+
+            done = i + 1 >= min_ns and intervals.converged(tolerances, relative)
+            if print_level(prtl, PrtLvl.Concise) and (done or (i + 1) % 10 == 0):
+                dt = time.time() - t0
+                ci = intervals.frame()
+                hw = ', '.join(f'{k} {ci.loc[k, "mean"]:.4g} +- {ci.loc[k, "halfwidth"]:.2g}'
+                               for k in tolerances)
+                print(f' replicas done: {i + 1}, elapsed {dt:.1f} s, {hw}')
+            if done:
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
@@ -1,27 +1,367 @@
 
+import tempfile
 import numpy as np
+import pandas as pd
 import networkx as nx
 from networkx import *
-from . utils import PrtLvl, print_level, throw_dice
+from . utils import PrtLvl, print_level
+from . rng import make_generator, RandomStream, default_stream
 
 prtl=PrtLvl.Concise
 
-def build_ed_network(turtles=20000, k=0.002):
-    G = nx.erdos_renyi_graph(turtles, k)
-    D = np.array([degree(G,n) for n in nodes(G)])
-    n = np.mean(D)
-    print(f' mean number of neighbors ={n}')
+def degree_array(G):
+    """Degrees of the nodes of G, in the order of the nodes"""
+    return np.fromiter((d for _, d in G.degree()), dtype=np.int64, count=len(G))
+
+
+def build_ed_network(turtles=20000, k=0.002, seed=None):
+    G = nx.erdos_renyi_graph(turtles, k, seed=seed)
+    n = np.mean(degree_array(G))
+    if print_level(prtl, PrtLvl.Concise):
+        print(f' mean number of neighbors ={n}')
     return G, n
 
 
-def build_ba_network(turtles=20000, k=20):
-    G = nx.barabasi_albert_graph(turtles, k)
-    D = np.array([degree(G,n) for n in nodes(G)])
-    n = np.mean(D)
-    print(f' mean number of neighbors ={n}')
+def build_ba_network(turtles=20000, k=20, seed=None):
+    G = nx.barabasi_albert_graph(turtles, k, seed=seed)
+    n = np.mean(degree_array(G))
+    if print_level(prtl, PrtLvl.Concise):
+        print(f' mean number of neighbors ={n}')
     return G, n
 
 
+def build_er_csr(turtles=20000, k=0.002, seed=None):
+    """As build_ed_network, with the graph as CSR arrays (indptr, indices), see er_csr"""
+    indptr, indices, D = er_csr(turtles, k, seed)
+    n = np.mean(D)
+    if print_level(prtl, PrtLvl.Concise):
+        print(f' mean number of neighbors ={n}')
+    return (indptr, indices), n
+
+
+def build_ba_csr(turtles=20000, k=20, seed=None):
+    """As build_ba_network, with the graph as CSR arrays (indptr, indices), see ba_csr"""
+    indptr, indices, D = ba_csr(turtles, k, seed)
+    n = np.mean(D)
+    if print_level(prtl, PrtLvl.Concise):
+        print(f' mean number of neighbors ={n}')
+    return (indptr, indices), n
+
+
+def er_edges(n, p, seed=None):
+    """Edges (u, v), u > v, of an Erdos-Renyi G(n, p) graph, in O(n + m).
+
+    The n (n - 1) / 2 pairs are numbered in the order (1, 0), (2, 0), (2, 1),
+    (3, 0) ... and the edges picked by geometric skipping (Batagelj & Brandes,
+    2005): the gaps between the numbers of consecutive edges are geometric with
+    parameter p, drawn in blocks.
+
+    """
+    pairs = n * (n - 1) // 2
+    if p <= 0 or pairs == 0:
+        k = np.zeros(0, dtype=np.int64)
+    elif p >= 1:
+        k = np.arange(pairs, dtype=np.int64)
+    else:
+        rng    = make_generator(seed)
+        block  = int(p * pairs + 5 * np.sqrt(p * pairs) + 16)
+        blocks = []
+        last   = -1
+        while last < pairs:
+            k     = last + np.cumsum(rng.geometric(p, size=block))
+            last  = k[-1]
+            blocks.append(k)
+        k = np.concatenate(blocks)
+        k = k[:np.searchsorted(k, pairs)]
+
+    u = ((1 + np.sqrt(1 + 8 * k.astype(np.float64))) // 2).astype(np.int64)
+    u[u * (u - 1) // 2 > k] -= 1                   # rounding of the sqrt
+    u[(u + 1) * u // 2 <= k] += 1
+    v = k - u * (u - 1) // 2
+    return u, v
+
+
+def ba_edges(n, m, seed=None, exact=100):
+    """Edges (u, v), u > v, of a Barabasi-Albert graph of n nodes, each attached
+    to m nodes, in O(n m). As in networkx, the graph starts as a star (node 0
+    linked to nodes 1 ... m), and nodes m + 1 ... n - 1 are added one by one.
+
+    Preferential attachment with the list of repeated nodes (Batagelj & Brandes,
+    2005): link j is slot 2 j + 1 of a list in which slot 2 j holds the new node,
+    and it takes the node in a uniformly chosen slot r_j < 2 j0, j0 the first link
+    of its node (the list before the node, as networkx), that is a node with
+    probability proportional to its degree. All the r_j are drawn at once, and
+    the odd slots (targets of earlier links) are resolved by following r, which
+    decreases at each jump. The links repeating a target of their node draw again
+    (and so the links that follow them) until all the targets of each node are
+    distinct: every node from m + 1 on has m links.
+
+    The first exact * m nodes, with the densest repetitions, draw their targets
+    one at a time, as networkx.
+
+    """
+    if not 1 <= m < n:
+        raise ValueError(f'Barabasi-Albert graph must have 1 <= m < n, m = {m}, n = {n}')
+
+    rng      = make_generator(seed)
+    n0       = min(n, (exact + 1) * m + 1)
+    src, dst = list(range(1, m + 1)), [0] * m                  # the star
+    repeated = [x for link in zip(src, dst) for x in link]
+    for u in range(m + 1, n0):
+        targets = set()
+        while len(targets) < m:
+            targets.add(repeated[int(rng.random() * len(repeated))])
+        for t in sorted(targets):
+            src.append(u)
+            dst.append(t)
+            repeated.extend((u, t))
+
+    first = len(src)                                           # links added one by one
+    links = first + (n - n0) * m
+    j     = np.arange(links, dtype=np.int64)
+    node  = np.concatenate([src, n0 + (j[first:] - first) // m]).astype(np.int64)
+    fixed = np.zeros(links, dtype=np.int64)
+    fixed[:first] = dst
+    j0    = first + (j[first:] - first) // m * m               # first link of the node
+    r     = np.zeros(links, dtype=np.int64)
+    r[first:] = (rng.random(links - first) * 2 * j0).astype(np.int64)
+
+    while True:
+        slot = r[first:].copy()
+        odd  = np.flatnonzero((slot & 1) & (slot >> 1 >= first))
+        while odd.size:
+            slot[odd] = r[slot[odd] >> 1]
+            odd       = odd[((slot[odd] & 1) & (slot[odd] >> 1 >= first)) == 1]
+
+        target = np.where(slot & 1, fixed[slot >> 1], node[slot >> 1]).reshape(-1, m)
+        order  = np.argsort(target, axis=1, kind='stable')
+        target = np.take_along_axis(target, order, axis=1)
+        repeat = np.zeros(target.shape, dtype=bool)
+        repeat[:, 1:] = target[:, 1:] == target[:, :-1]
+        again  = (np.flatnonzero(repeat) // m * m + order[repeat]).astype(np.int64)
+        if not again.size:
+            break
+        r[first + again] = (rng.random(again.size) * 2 * j0[again]).astype(np.int64)
+
+    return (np.concatenate([src, node[first:]]).astype(np.int64),
+            np.concatenate([dst, target.ravel()]).astype(np.int64))
+
+
+def csr_from_edges(n, u, v):
+    """Adjacency of the undirected graph of n nodes and edges (u, v) in CSR form
+    (indptr, indices, as adjacency_arrays), the neighbors of each node sorted.
+
+    """
+    src     = np.concatenate([u, v])
+    dst     = np.concatenate([v, u])
+    order   = np.argsort(src.astype(np.int64) * n + dst)
+    indptr  = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, dst[order].astype(np.int32)
+
+
+def er_csr(n, p, seed=None):
+    """An Erdos-Renyi G(n, p) graph (see er_edges) as CSR arrays and the degrees"""
+    indptr, indices = csr_from_edges(n, *er_edges(n, p, seed))
+    return indptr, indices, np.diff(indptr)
+
+
+def ba_csr(n, m, seed=None):
+    """A Barabasi-Albert graph (see ba_edges) as CSR arrays and the degrees"""
+    indptr, indices = csr_from_edges(n, *ba_edges(n, m, seed))
+    return indptr, indices, np.diff(indptr)
+
+
+def csr_to_networkx(indptr, indices):
+    """The networkx graph of the CSR arrays, nodes 0 ... n - 1"""
+    G = nx.Graph()
+    G.add_nodes_from(range(len(indptr) - 1))
+    src = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    G.add_edges_from(zip(src.tolist(), indices.tolist()))
+    return G
+
+
+def adjacency_arrays(G):
+    """The nodes of G and its adjacency in CSR form (indptr, indices: positions
+    in nodes), keeping the order of the neighbors of each node.
+
+    """
+    nodes   = list(G)
+    index   = {node: i for i, node in enumerate(nodes)}
+    indptr  = np.zeros(len(nodes) + 1, dtype=np.int64)
+    indices = []
+    for i, node in enumerate(nodes):
+        nbrs = G.adj[node]
+        indices.extend(index[nbr] for nbr in nbrs)
+        indptr[i + 1] = indptr[i] + len(nbrs)
+    return np.array(nodes), indptr, np.array(indices, dtype=np.int32)
+
+
+def graph_from_adjacency(nodes, indptr, indices):
+    """The graph of adjacency_arrays, with the same order of the nodes and of
+    the neighbors of each node (thus iterated as the original).
+
+    """
+    G = nx.Graph()
+    nodes = nodes.tolist()
+    G.add_nodes_from(nodes)
+    adj = G._adj     # filled directly: add_edge would not keep the order
+    for i, node in enumerate(nodes):
+        nbrs = adj[node]
+        for j in indices[indptr[i]:indptr[i + 1]].tolist():
+            nbr = nodes[j]
+            data = adj[nbr].get(node)      # the edge data dict is shared
+            nbrs[nbr] = {} if data is None else data
+    return G
+
+
+def read_edge_chunks(path, delimiter=None, comments='#', skiprows=0, dtype=np.int64,
+                     chunk=2**20):
+    """Iterator over the edges of an edge list file (two columns, node ids, any
+    other columns ignored), as pairs of arrays of at most chunk edges. delimiter
+    None means whitespace (e.g, ',' for CSV files).
+
+    """
+    sep    = r'\s+' if delimiter is None else delimiter
+    reader = pd.read_csv(path, sep=sep, header=None, usecols=[0, 1], comment=comments,
+                         skiprows=skiprows, dtype=dtype, chunksize=chunk)
+    for df in reader:
+        yield df[0].to_numpy(), df[1].to_numpy()
+
+
+class NodeTable:
+    """Hash table (a dict) of node ids to dense labels 0 ... n - 1, in order of
+    arrival. The new ids of each chunk are kept as an array, concatenated once
+    by nodes(), so that a chunk costs in proportion to its own size.
+
+    """
+
+    def __init__(self):
+        self.labels = {}      # id -> label
+        self.chunks = []      # the new ids of each chunk, in order of arrival
+
+
+    def __len__(self):
+        return len(self.labels)
+
+
+    def relabel(self, ids):
+        """The labels of the array ids, new ids get the next labels"""
+        codes, uniques = pd.factorize(ids)
+        labels = self.labels
+        n      = len(labels)
+        found  = np.fromiter((labels.setdefault(x, len(labels)) for x in uniques.tolist()),
+                             dtype=np.int64, count=len(uniques))
+        if len(labels) > n:
+            self.chunks.append(uniques[found >= n])
+        return found[codes]
+
+
+    def nodes(self):
+        return np.concatenate(self.chunks) if self.chunks else np.array([])
+
+
+def load_edge_list(path, delimiter=None, comments='#', skiprows=0, dtype=np.int64,
+                   chunk=2**20, dedupe=True):
+    """Reads an (undirected) edge list file into CSR form: the node ids (nodes),
+    indptr and indices as adjacency_arrays, node i being nodes[i].
+
+    The file is streamed in chunks of edges (see read_edge_chunks) and the node
+    ids relabeled to 0 ... n - 1 with a NodeTable. Self loops are dropped, and
+    if dedupe the repeated edges (e.g, u v and v u) too. The CSR arrays are built
+    by counting sort in two passes: the first counts the degrees and keeps the
+    relabeled edges in a temporary binary file, the second reads them back and
+    places each one in its row. The memory needed is that of the CSR arrays, the
+    node table and the work arrays of a chunk (about 100 bytes per edge).
+
+    For BarrioTortugaNXArray, pass (indptr, indices); for BarrioTortugaNX, the
+    graph graph_from_adjacency(np.arange(n), indptr, indices) (turtle i lives in
+    node i).
+
+    """
+    table = NodeTable()
+    deg   = np.zeros(1024, dtype=np.int64)
+    edges = 0
+    with tempfile.TemporaryFile() as tmp:
+        for u, v in read_edge_chunks(path, delimiter, comments, skiprows, dtype, chunk):
+            uv   = table.relabel(np.concatenate([u, v]))
+            u, v = uv[:len(u)], uv[len(u):]
+            loop = u != v
+            u, v = u[loop], v[loop]
+            if len(table) > len(deg):
+                deg = np.concatenate([deg, np.zeros(max(len(table), 2 * len(deg)) - len(deg),
+                                                    dtype=np.int64)])
+            deg += np.bincount(u, minlength=len(deg)) + np.bincount(v, minlength=len(deg))
+            np.stack([u, v], axis=1).astype(np.int32).tofile(tmp)
+            edges += len(u)
+
+        n       = len(table)
+        indptr  = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(deg[:n], out=indptr[1:])
+        indices = np.empty(indptr[-1], dtype=np.int32)
+        cursor  = indptr[:-1].copy()                 # next free slot of each row
+
+        tmp.seek(0)
+        while True:
+            uv = np.fromfile(tmp, dtype=np.int32, count=max(2, chunk // 2 * 2)).reshape(-1, 2)
+            if len(uv) == 0:
+                break
+            src   = np.concatenate([uv[:, 0], uv[:, 1]])
+            dst   = np.concatenate([uv[:, 1], uv[:, 0]])
+            order = np.argsort(src, kind='stable')
+            src   = src[order]
+            first = np.flatnonzero(np.concatenate([[True], src[1:] != src[:-1]]))
+            count = np.diff(np.append(first, len(src)))
+            rank  = np.arange(len(src)) - np.repeat(first, count)   # within the row
+            indices[cursor[src] + rank] = dst[order]
+            cursor[src[first]] += count
+
+    if dedupe:
+        indptr, indices = dedupe_csr(indptr, indices, chunk)
+
+    if print_level(prtl, PrtLvl.Concise):
+        stats = degree_stats(indptr)
+        print(f' read {edges} edges, {stats["nodes"]} nodes, {stats["edges"]} links:'
+              f' mean k = {stats["mean_k"]:.3f}, max k = {stats["max_k"]}')
+    return table.nodes(), indptr, indices
+
+
+def dedupe_csr(indptr, indices, chunk=2**20):
+    """Sorts the neighbors of each node and drops the repeated ones, in place, a
+    block of rows of about chunk entries at a time. Returns the new (indptr,
+    indices), indices a view of the array given.
+
+    """
+    n     = len(indptr) - 1
+    new   = np.zeros_like(indptr)
+    write = 0
+    a     = 0
+    while a < n:
+        b     = min(n, max(a + 1, np.searchsorted(indptr, indptr[a] + chunk, side='right') - 1))
+        deg   = np.diff(indptr[a:b + 1])
+        row   = np.repeat(np.arange(a, b, dtype=np.int64), deg)
+        key   = np.sort(row * n + indices[indptr[a]:indptr[b]])
+        keep  = np.concatenate([[True], key[1:] != key[:-1]]) if len(key) else key.astype(bool)
+        key   = key[keep]
+        indices[write:write + len(key)] = key % n
+        np.cumsum(np.bincount(key // n - a, minlength=b - a), out=new[a + 1:b + 1])
+        new[a + 1:b + 1] += write
+        write += len(key)
+        a      = b
+    return new, indices[:write]
+
+
+def degree_stats(indptr):
+    """Degree statistics of a CSR graph (as degree_list, mean_k, max_k, sum_k)"""
+    D = np.diff(indptr)
+    return dict(nodes  = len(D),
+                edges  = int(D.sum()) // 2,
+                sum_k  = int(D.sum()),
+                mean_k = float(D.mean()) if len(D) else 0.0,
+                max_k  = int(D.max()) if len(D) else 0,
+                min_k  = int(D.min()) if len(D) else 0)
+
+
 def degree_list(g):
     D = np.array([degree(g,n) for n in nodes(g)])
     return D
@@ -55,13 +395,19 @@ def node_list_ki_kj(G, ki, kj):
     return nl[ki:kj]
 
 
-def node_list_rnd(G):
-    return np.random.shuffle(node_list(G))
+def node_list_rnd(G, random_state=None):
+    """The nodes of G shuffled (random_state: None for the global state, a seed or
+    a numpy Generator)"""
+    nl  = node_list(G)
+    rng = np.random if random_state is None else np.random.default_rng(random_state)
+    rng.shuffle(nl)
+    return nl
 
 
-def node_list_rnd_ki_kj(G, ki, kj):
-    nl = node_list_ki_kj(G, ki, kj)
-    np.random.shuffle(nl)
+def node_list_rnd_ki_kj(G, ki, kj, random_state=None):
+    nl  = node_list_ki_kj(G, ki, kj)
+    rng = np.random if random_state is None else np.random.default_rng(random_state)
+    rng.shuffle(nl)
     return nl
 
 
@@ -137,7 +483,10 @@ def KE_network_init(m=10):
     return G
 
 
-def select_random_node(G, WG, norm0):
+def select_random_node(G, WG, norm0, stream=None):
+    """A node of G not in WG, by preferential attachment, drawn from stream (a
+    rng.RandomStream; the unseeded default stream if None)"""
+    stream = default_stream if stream is None else stream
 
     def pa_norm(g, WG):
         norm = 0
@@ -145,7 +494,7 @@ def select_random_node(G, WG, norm0):
             norm += degree(G, n)
         return norm
 
-    rnodes = node_list_rnd_ki_kj(G, 0, -1)
+    rnodes = node_list_rnd_ki_kj(G, 0, -1, random_state=stream.generator)
     #print(rnodes)
     for n in rnodes:
         if n in WG:
@@ -158,14 +507,14 @@ def select_random_node(G, WG, norm0):
             if print_level(prtl, PrtLvl.Verbose):
                 print(f' node  = {n} pa = {pa}, degree = {degree(G, n)}, norm = {norm0}')
 
-            if throw_dice(pa):
+            if stream.throw_dice(pa):
                 if print_level(prtl, PrtLvl.Verbose):
                     print(f' selecting random node = {n} with prob = {pa}')
                 break
     return n
 
-def KE_newtwork_step(G, mu):
-    """
+def KE_newtwork_step(G, mu, stream=None):
+    r"""
     Steps the KE network
 
     - 1. A new node joins the network in the following way:
@@ -180,11 +529,16 @@ def KE_newtwork_step(G, mu):
     - i. The probability that node $i$ is chosen for deactivation
          is $p_i = \frac{a}{k_i}$ with normalisation $ a = \sum_j \frac{1}{k_j}$
 
+    The random numbers come from stream (a rng.RandomStream, e.g,
+    RandomStream(make_generator(seed))), or from the unseeded default stream if
+    None. KE_network builds the whole network from a seed (see ke_edges).
+
     """
+    stream = default_stream if stream is None else stream
 
     def deactivate_node(Pd):
         for node, pd in Pd.items():
-            if throw_dice(pd):      # random node
+            if stream.throw_dice(pd):      # random node
                 if print_level(prtl, PrtLvl.Verbose):
                     print(f' deactivating node = {node} with prob = {pd}')
                 break
@@ -210,8 +564,8 @@ def KE_newtwork_step(G, mu):
             continue
 
         else:
-            if throw_dice(mu): # attach to a random node
-                rnode = select_random_node(G, WG, norm)
+            if stream.throw_dice(mu): # attach to a random node
+                rnode = select_random_node(G, WG, norm, stream)
                 #print(f' selected node = {rnode}, WG = {WG}')
                 if rnode not in WG:
                     WG.append(rnode)
@@ -249,16 +603,130 @@ def KE_newtwork_step(G, mu):
     G.nodes[node]['state'] = 0
 
 
-def KE_network(N, m=10, mu=0.5):
+def KE_network(N, m=10, mu=0.5, seed=None):
     """
     The KE network is build up to N nodes starting from
-    m fully connected nodes.
+    m fully connected nodes (see ke_edges). The nodes
+    keep their final state (1 active, 0 inactive).
 
     """
+    u, v, active = ke_edges(N, m, mu, seed)
+    G = nx.Graph()
+    G.add_nodes_from(range(N), state=0)
+    G.add_edges_from(zip(u.tolist(), v.tolist()))
+    for n in active.tolist():
+        G.nodes[n]['state'] = 1
+    return G
 
-    G = KE_network_init(m)
 
-    for step in np.arange(N-m):
-        KE_newtwork_step(G, mu)
+class FenwickTree:
+    """Fenwick (binary indexed) tree of n weights: changes a weight and finds the
+    item of a cumulative weight in O(log n).
 
-    return G
+    """
+
+    def __init__(self, n):
+        self.n     = n
+        self.tree  = [0] * (n + 1)
+        self.total = 0
+        self.top   = 1 << n.bit_length()
+
+
+    def add(self, i, delta):
+        """Adds delta to the weight of item i"""
+        self.total += delta
+        i += 1
+        tree, n = self.tree, self.n
+        while i <= n:
+            tree[i] += delta
+            i += i & -i
+
+
+    def find(self, w):
+        """The item i such that the sum of the weights of the items before i is
+        <= w < that sum plus the weight of i (0 <= w < total)
+
+        """
+        tree, n = self.tree, self.n
+        pos  = 0
+        step = self.top
+        while step:
+            nxt = pos + step
+            if nxt <= n and tree[nxt] <= w:
+                pos = nxt
+                w  -= tree[nxt]
+            step >>= 1
+        return min(pos, n - 1)
+
+
+def ke_edges(n, m=10, mu=0.5, seed=None):
+    """Edges (u, v), u > v, of a Klemm-Eguiluz network of n nodes and the m nodes
+    active at the end, in O(n m log n).
+
+    The network starts with m fully connected active nodes. Each new node links
+    to each of the m active nodes or, with probability mu, to a node chosen by
+    preferential attachment (probability proportional to its degree) instead,
+    without repeating a node; then it becomes active and one of the active nodes
+    is deactivated with probability proportional to 1/k. The degrees are kept
+    in a Fenwick tree for the attachment, and 1/k of the active nodes in another
+    one for the deactivation, thus a step costs O(m log n).
+
+    """
+    if not 1 <= m <= n:
+        raise ValueError(f'KE network must have 1 <= m <= n, m = {m}, n = {n}')
+
+    def inv(k):                             # weight of deactivation
+        return 1 / k if k else 1.
+
+    dice   = RandomStream(make_generator(seed))
+    deg    = [m - 1] * m + [0] * (n - m)
+    ktree  = FenwickTree(n)                 # degrees
+    itree  = FenwickTree(n)                 # 1/k of the active nodes
+    active = set(range(m))
+    u, v   = [], []
+    for i in range(m):
+        ktree.add(i, m - 1)
+        itree.add(i, inv(m - 1))
+        for j in range(i):
+            u.append(i)
+            v.append(j)
+
+    for new in range(m, n):
+        targets = set()
+        taken   = 0                         # degree of the targets
+        for node in sorted(active):
+            if dice.random() < mu and ktree.total > taken:    # random node, by degree
+                node = ktree.find(dice.random() * ktree.total)
+                while node in targets:
+                    node = ktree.find(dice.random() * ktree.total)
+            if node not in targets:
+                targets.add(node)
+                taken += deg[node]
+
+        for t in sorted(targets):
+            u.append(new)
+            v.append(t)
+            ktree.add(t, 1)
+            if t in active:
+                itree.add(t, inv(deg[t] + 1) - inv(deg[t]))
+            deg[t] += 1
+        deg[new] = len(targets)
+        ktree.add(new, deg[new])
+        itree.add(new, inv(deg[new]))
+        active.add(new)
+
+        node = itree.find(dice.random() * itree.total)        # deactivation
+        while node not in active:                             # rounding of the sums
+            node = itree.find(dice.random() * itree.total)
+        itree.add(node, -inv(deg[node]))
+        active.remove(node)
+
+    return (np.array(u, dtype=np.int64), np.array(v, dtype=np.int64),
+            np.array(sorted(active), dtype=np.int64))
+
+
+def ke_csr(n, m=10, mu=0.5, seed=None):
+    """A Klemm-Eguiluz network (see ke_edges) as CSR arrays and the degrees"""
+    u, v, _ = ke_edges(n, m, mu, seed)
+    indptr, indices = csr_from_edges(n, u, v)
+    return indptr, indices, np.diff(indptr)
@@ -0,0 +1,157 @@
+"""
+Random numbers for the turtle models.
+
+A call to np.random.random_sample() per dice throw is expensive: most of its cost
+is the overhead of the call, not the generation of the number. RandomStream draws
+the uniform numbers in large blocks (one vectorised call per block) and serves
+them one at a time as python floats.
+
+All the random numbers of a model come from a single seed: SeededModel derives
+from it (through numpy's SeedSequence) independent Philox streams for the numpy
+and scipy draws, the dice throws, Mesa's python random and, optionally, each agent.
+Replicas of an ensemble get independent seeds with spawn_seeds, so they can run
+in any order or process and still be reproduced bit for bit.
+"""
+
+import random
+import numpy as np
+from mesa import Model
+
+BLOCK_SIZE       = 8192
+AGENT_BLOCK_SIZE = 64      # per-agent streams: many streams, few draws each
+BRANCH_KEY       = 4       # spawn key of the branches, after the 4 model streams
+
+
+class RandomStream:
+    """A stream of uniform random numbers in [0, 1) served from blocks of
+    block_size numbers, drawn from generator (a numpy Generator, a new one
+    by default) and refilled transparently when exhausted.
+
+    """
+
+    def __init__(self, generator=None, block_size=BLOCK_SIZE):
+        if generator is None:
+            generator = np.random.default_rng()
+        self.generator  = generator
+        self.block_size = block_size
+        self.refill()
+
+
+    def refill(self):
+        self.block = self.generator.random(self.block_size).tolist()
+        self.i     = 0
+
+
+    def random(self):
+        if self.i == self.block_size:
+            self.refill()
+        u = self.block[self.i]
+        self.i += 1
+        return u
+
+
+    def throw_dice(self, dice):
+        """True with probability dice"""
+        return self.random() < dice
+
+
+# default stream, for the code that does not belong to a model (e.g, networks)
+default_stream = RandomStream()
+
+
+def seed_sequence(seed=None):
+    """A SeedSequence from seed: None (fresh entropy), an int or a SeedSequence"""
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    return np.random.SeedSequence(seed)
+
+
+def make_generator(seed=None):
+    """A numpy Generator with a Philox (counter-based) bit generator"""
+    return np.random.Generator(np.random.Philox(seed_sequence(seed)))
+
+
+def spawn_seeds(seed, n):
+    """n independent child seed sequences of seed (e.g, for the replicas of an
+    ensemble). Unlike SeedSequence.spawn, the i-th child depends only on seed
+    and i, not on the children spawned before.
+
+    """
+    ss = seed_sequence(seed)
+    return [np.random.SeedSequence(ss.entropy, spawn_key=ss.spawn_key + (i,))
+            for i in range(n)]
+
+
+class SeededModel(Model):
+    """A Mesa model whose random numbers all derive from one seed.
+
+    The models take a keyword argument seed (None, int or SeedSequence) and call
+    seed_streams(seed) in their constructor, which sets:
+        seed_seq : the SeedSequence of the model
+        rng      : numpy Generator, for numpy and scipy (random_state) draws
+        stream   : RandomStream, for the dice throws
+        random   : python Random used by Mesa (scheduler, moves), per instance
+                   (Mesa 0.8 shares a single one between all the models)
+
+    """
+
+    def __new__(cls, *args, **kwargs):
+        # Mesa seeds python's Random with kwargs['seed'], which does not accept
+        # a SeedSequence: the streams are set instead by seed_streams.
+        kwargs.pop('seed', None)
+        return super().__new__(cls, *args, **kwargs)
+
+
+    def seed_streams(self, seed=None):
+        self.seed_seq = seed_sequence(seed)
+        s_np, s_dice, s_py, self.agent_seed_seq = spawn_seeds(self.seed_seq, 4)
+
+        self.rng    = make_generator(s_np)
+        self.stream = RandomStream(make_generator(s_dice))
+        self.random = random.Random(int(s_py.generate_state(1, np.uint64)[0]))
+
+
+    def agent_stream(self, unique_id):
+        """Independent stream of the agent unique_id"""
+        ss = np.random.SeedSequence(self.agent_seed_seq.entropy,
+                                    spawn_key=self.agent_seed_seq.spawn_key + (unique_id,))
+        return RandomStream(make_generator(ss), AGENT_BLOCK_SIZE)
+
+
+    def branch_seeds(self, n, seed=None):
+        """Seeds of n branches of the model (see fork): spawned from seed or, by
+        default, from the seed of the model and the current step.
+
+        """
+        if seed is None:
+            seed = np.random.SeedSequence(self.seed_seq.entropy,
+                                          spawn_key=self.seed_seq.spawn_key +
+                                                    (BRANCH_KEY, self.schedule.steps))
+        return spawn_seeds(seed, n)
+
+
+    def random_state(self):
+        """The state of the streams of the model (for a checkpoint). The
+        per-agent streams are not included.
+
+        """
+        return dict(entropy   = self.seed_seq.entropy,
+                    spawn_key = list(self.seed_seq.spawn_key),
+                    rng       = self.rng.bit_generator.state,
+                    stream    = self.stream.generator.bit_generator.state,
+                    block     = np.array(self.stream.block),
+                    i         = self.stream.i,
+                    random    = self.random.getstate())
+
+
+    def set_random_state(self, state):
+        """Restores the streams from random_state()"""
+        self.seed_streams(np.random.SeedSequence(state['entropy'],
+                                                 spawn_key=tuple(state['spawn_key'])))
+        self.rng.bit_generator.state              = state['rng']
+        self.stream.generator.bit_generator.state = state['stream']
+        self.stream.block      = state['block'].tolist()
+        self.stream.block_size = len(self.stream.block)
+        self.stream.i          = state['i']
+        version, internal, gauss = state['random']
+        self.random.setstate((version, tuple(internal), gauss))
@@ -0,0 +1,106 @@
+"""
+Schedulers for the SEIR turtle models.
+
+In a SEIR model most turtles are, most of the time, susceptible or recovered and
+have nothing to do in the infection phase of a tick. RandomActivation shuffles
+and steps all of them anyway. The rest only change state at known times, that can be
+booked in a calendar instead of being checked at every tick.
+"""
+
+import math
+from mesa.time import BaseScheduler
+
+from . utils import EXPOSED, INFECTED
+
+
+class StateActivation(BaseScheduler):
+    """A scheduler that keeps the agents in buckets by state (see utils.KINDS)
+    and, at each step:
+
+        1) activates, in random order (reshuffled every step, as RandomActivation),
+           only the agents whose state is in active, calling their method stage.
+        2) if all_stage is not None, calls the method all_stage of all the agents
+           (e.g, the movement of the turtles in a grid).
+
+    The agents must report their changes of state through change_state
+    (see TurtleBase.set_state).
+
+    """
+
+    def __init__(self, model, active=(EXPOSED, INFECTED), stage='infection_step', all_stage=None):
+        super().__init__(model)
+        self.active    = active
+        self.stage     = stage
+        self.all_stage = all_stage
+        self.buckets   = {}    # state -> dict (unique_id -> agent)
+
+
+    def add(self, agent):
+        super().add(agent)
+        self.buckets.setdefault(agent.state, {})[agent.unique_id] = agent
+
+
+    def remove(self, agent):
+        super().remove(agent)
+        del self.buckets[agent.state][agent.unique_id]
+
+
+    def change_state(self, agent, old_state, new_state):
+        del self.buckets[old_state][agent.unique_id]
+        self.buckets.setdefault(new_state, {})[agent.unique_id] = agent
+
+
+    def active_agents(self):
+        return [agent for state in self.active
+                      for agent in self.buckets.get(state, {}).values()]
+
+
+    def step(self):
+        # agents changing state during the step are not activated until next step
+        active = self.active_agents()
+        self.model.random.shuffle(active)
+        for agent in active:
+            getattr(agent, self.stage)()
+
+        # the order does not matter here: the agents act independently
+        if self.all_stage is not None:
+            for agent in self.agents:
+                getattr(agent, self.all_stage)()
+
+        self.steps += 1
+        self.time += 1
+
+
+def due_tick(tag, t):
+    """First tick s such that s - tag > t: the tick in which a turtle tagged at
+    tag changes state, for an incubation (or recovery) time t in ticks.
+
+    """
+    return math.floor(tag + t) + 1
+
+
+class TransitionCalendar:
+    """A bucketed queue of the pending changes of state of the agents.
+
+    buckets: dict tick -> list of (agent, new state) due at that tick.
+
+    A change is booked once (schedule), when it becomes known, and the model pops
+    the bucket of each tick, rather than checking every exposed and infected
+    agent at every tick.
+
+    """
+
+    def __init__(self):
+        self.buckets = {}
+
+
+    def schedule(self, tick, agent, state):
+        self.buckets.setdefault(tick, []).append((agent, state))
+
+
+    def pop(self, tick):
+        return self.buckets.pop(tick, [])
+
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.buckets.values())
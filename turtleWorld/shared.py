@@ -0,0 +1,89 @@
+"""
+Arrays shared between the processes of an ensemble.
+
+A SharedGraph publishes the arrays of a graph (nodes, CSR adjacency, degrees, see
+cache.GRAPH_ARRAYS) once, in blocks of multiprocessing.shared_memory. The object
+pickles as the names of the blocks: passed to the workers (e.g, in the
+parameters of the replicas) it is attached there as read only NumPy arrays on
+the same memory, without a copy. Each worker attaches a block once and keeps it
+for its following replicas.
+
+The process that creates the SharedGraph owns the blocks and frees them with
+close() (or at the end of a with block). Use it as:
+
+    with shared_network('BA', 40000, 20, graph_seed=1, engine='array') as graph:
+        run_ensemble(nx_model, ns, steps, dict(params, graph=graph), seed)
+"""
+
+import numpy as np
+from multiprocessing import shared_memory
+
+_attached = {}      # name -> SharedMemory attached by this process
+
+
+def attach(name):
+    """The block name, attached once per process"""
+    if name not in _attached:
+        try:    # python >= 3.13: the owner alone tracks (and unlinks) the block
+            _attached[name] = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            _attached[name] = shared_memory.SharedMemory(name=name)
+    return _attached[name]
+
+
+class SharedGraph:
+    """The dict of arrays of a graph in shared memory. key identifies the graph
+    (e.g, cache.graph_key), it is also its str (and thus its part of the keys of
+    the run cache).
+
+    """
+
+    def __init__(self, arrays, key):
+        self.key    = key
+        self.specs  = {}
+        self.blocks = []
+        for name, a in arrays.items():
+            a   = np.ascontiguousarray(a)
+            shm = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+            np.ndarray(a.shape, a.dtype, buffer=shm.buf)[...] = a
+            self.blocks.append(shm)
+            self.specs[name] = (shm.name, a.shape, a.dtype.str)
+
+
+    def __getstate__(self):
+        return dict(key=self.key, specs=self.specs, blocks=[])
+
+
+    def __str__(self):
+        return f'SharedGraph({self.key})'
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def arrays(self):
+        """dict of read only arrays on the shared memory"""
+        A = {}
+        for name, (block, shape, dtype) in self.specs.items():
+            a = np.ndarray(shape, np.dtype(dtype), buffer=attach(block).buf)
+            a.flags.writeable = False
+            A[name] = a
+        return A
+
+
+    def nbytes(self):
+        return sum(int(np.prod(shape)) * np.dtype(dtype).itemsize
+                   for _, shape, dtype in self.specs.values())
+
+
+    def close(self):
+        """Frees the blocks (owner only)"""
+        for shm in self.blocks:
+            shm.close()
+            shm.unlink()
+        self.blocks = []
@@ -0,0 +1,68 @@
+"""
+Spatial index for turtles living in a toroidal grid.
+
+Mesa's MultiGrid answers neighborhood queries by recomputing the coordinates of
+the neighbor cells and building the list of their contents each time. The index
+below precomputes the (torus) Moore neighborhood of every cell once, and keeps,
+per cell, the susceptible turtles found there. It is updated incrementally when a
+susceptible turtle moves or stops being susceptible.
+"""
+
+
+def moore_offsets(moore=True):
+    """Offsets of the neighborhood, own cell included"""
+    if moore:
+        return [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+    else:
+        return [(0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)]
+
+
+class TorusIndex:
+    """Occupancy index of a toroidal grid of width x height cells.
+
+    neighborhood : dict cell -> tuple of the cells of its neighborhood
+                   (own cell included), wrapped around the torus.
+    susceptibles : dict cell -> dict (unique_id -> agent) of the susceptible
+                   turtles in the cell. A dict (rather than a set) keeps the
+                   insertion order and thus the runs reproducible.
+    """
+
+    def __init__(self, width, height, moore=True):
+        self.width  = width
+        self.height = height
+        offsets     = moore_offsets(moore)
+
+        self.neighborhood = {}
+        self.susceptibles = {}
+        for x in range(width):
+            for y in range(height):
+                self.neighborhood[(x, y)] = tuple(((x + dx) % width, (y + dy) % height)
+                                                  for dx, dy in offsets)
+                self.susceptibles[(x, y)] = {}
+
+
+    def add(self, agent, pos):
+        self.susceptibles[pos][agent.unique_id] = agent
+
+
+    def remove(self, agent, pos):
+        del self.susceptibles[pos][agent.unique_id]
+
+
+    def move(self, agent, old_pos, new_pos):
+        if old_pos != new_pos:
+            self.remove(agent, old_pos)
+            self.add(agent, new_pos)
+
+
+    def susceptibles_near(self, pos):
+        """List of the susceptible turtles in the neighborhood of pos.
+        The list is a copy: the caller can expose turtles while iterating.
+
+        """
+        return [agent for cell in self.neighborhood[pos]
+                      for agent in self.susceptibles[cell].values()]
+
+
+    def number_of_susceptibles(self):
+        return sum(len(agents) for agents in self.susceptibles.values())
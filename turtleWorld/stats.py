@@ -24,14 +24,14 @@ def c19_nbinom_pdf(r0, k, x):
     return nbinom.pmf(x, n, p)
 
 
-def c19_nbinom_rvs(r0, k, size=0):
+def c19_nbinom_rvs(r0, k, size=0, random_state=None):
     """Generates random variates"""
     n, p = c19_nbinom_transform(r0, k)
 
     if size > 1:
-        r= nbinom.rvs(n, p, size=size)
+        r= nbinom.rvs(n, p, size=size, random_state=random_state)
     else:
-        r= nbinom.rvs(n, p)
+        r= nbinom.rvs(n, p, random_state=random_state)
     return r
 
 
@@ -44,9 +44,11 @@ def weib_pdf(x,shape,scale):
     return weibull_min(x, shape, scale=scale)
 
 
-def c19_weib_rvs(mu, rms, size=10):
-    """Generates random variates"""
-    r = mu * np.random.weibull(rms, size=size)
+def c19_weib_rvs(mu, rms, size=10, random_state=None):
+    """Generates random variates (random_state: None for the global state, a seed
+    or a numpy Generator)"""
+    rng = np.random if random_state is None else np.random.default_rng(random_state)
+    r = mu * rng.weibull(rms, size=size)
     return r
 
 
@@ -54,21 +56,21 @@ def normal_pdf(x,mu,rms):
     return norm.pdf(x, loc=mu, scale=rms)
 
 
-def normal_rvs(mu, sigma, size=10):
+def normal_rvs(mu, sigma, size=10, random_state=None):
     """Generates random variates"""
-    return norm.rvs(loc=mu, scale=sigma, size=size)
+    return norm.rvs(loc=mu, scale=sigma, size=size, random_state=random_state)
 
 
 def sknormal_pdf(x,mu,rms, a):
     return skewnorm.pdf(x, a, loc=mu, scale=rms)
 
 
-def sknormal_rvs(mu, sigma, a, size=0):
+def sknormal_rvs(mu, sigma, a, size=0, random_state=None):
     """Generates random variates"""
     if size == 0:
-        return skewnorm.rvs(a, loc=mu, scale=sigma)
+        return skewnorm.rvs(a, loc=mu, scale=sigma, random_state=random_state)
     else:
-        return skewnorm.rvs(a, loc=mu, scale=sigma, size=size)
+        return skewnorm.rvs(a, loc=mu, scale=sigma, size=size, random_state=random_state)
 
 
 def lognorm_pdf(x, mu, sigma):
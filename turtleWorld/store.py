@@ -0,0 +1,129 @@
+"""
+Columnar store for the replicas of an ensemble.
+
+One directory per configuration holds:
+
+    meta.json    columns, number of replicas and steps, parameters of the run
+    series.npy   (replica x tick x compartment) cube of counts (int32)
+    written.npy  (replica) flags of the replicas already written
+    Ti.npy, Tr.npy, P.npy
+                 (replica x turtle) parameters of the turtles (float32)
+
+The files are plain .npy arrays, opened as memory maps: the replicas are written
+in place as they arrive (in any order), and a reader gets a slice (a compartment,
+a range of ticks or of replicas) without loading the rest of the cube.
+"""
+
+import os
+import json
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+
+AGENT_ARRAYS = ('Ti', 'Tr', 'P')
+SEIR_COLUMNS = ('NumberOfInfected', 'NumberOfSusceptible',
+                'NumberOfRecovered', 'NumberOfExposed')   # the model reporters
+
+
+def is_store(path):
+    return os.path.isfile(os.path.join(path, 'meta.json'))
+
+
+class EnsembleStore:
+    """Store of the ensemble in directory path (see create to make a new one).
+    mode is the mode of the memory maps: 'r' (read only) or 'r+'.
+
+    """
+
+    def __init__(self, path, mode='r'):
+        self.path = path
+        self.mode = mode
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.columns = self.meta['columns']
+        self.ns      = self.meta['ns']
+        self.steps   = self.meta['steps']
+        self.cube    = open_memmap(self.file('series'), mode=mode)
+        self.written = open_memmap(self.file('written'), mode=mode)
+        self.agents  = {name: open_memmap(self.file(name), mode=mode)
+                        for name in AGENT_ARRAYS if os.path.isfile(self.file(name))}
+
+
+    @classmethod
+    def create(cls, path, ns, steps, turtles=None, columns=SEIR_COLUMNS, meta=None):
+        """Creates an empty store for ns replicas of steps steps (steps + 1 ticks)
+        of the time series columns. If turtles is not None, it keeps also the
+        parameters (Ti, Tr, P) of the turtles of each replica. meta: dict of
+        parameters of the run, kept in meta.json.
+
+        """
+        os.makedirs(path, exist_ok=True)
+        info = dict(meta or {}, columns=list(columns), ns=ns, steps=steps, turtles=turtles)
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(info, f, indent=1)
+
+        def new(name, dtype, shape):
+            open_memmap(os.path.join(path, f'{name}.npy'), mode='w+',
+                        dtype=dtype, shape=shape).flush()
+
+        new('series',  np.int32, (ns, steps + 1, len(columns)))
+        new('written', np.bool_, (ns,))
+        if turtles is not None:
+            for name in AGENT_ARRAYS:
+                new(name, np.float32, (ns, turtles))
+        return cls(path, mode='r+')
+
+
+    def file(self, name):
+        return os.path.join(self.path, f'{name}.npy')
+
+
+    def write(self, i, dft, stats=None):
+        """Writes replica i: its time series dft (steps + 1 rows, the columns of the
+        store) and the parameters of its turtles stats (Ti, Tr, P), if kept.
+
+        """
+        self.cube[i] = dft[self.columns].to_numpy()
+        if stats is not None:
+            for name, array in self.agents.items():
+                array[i] = stats[name].to_numpy()
+        self.written[i] = True
+
+
+    def flush(self):
+        self.cube.flush()
+        self.written.flush()
+        for array in self.agents.values():
+            array.flush()
+
+
+    def replicas(self):
+        """Indexes of the replicas written"""
+        return np.flatnonzero(self.written)
+
+
+    def series(self, column, replicas=slice(None), ticks=slice(None)):
+        """The (replica x tick) counts of column (a view of the memory map)"""
+        return self.cube[replicas, ticks, self.columns.index(column)]
+
+
+    def replica(self, i):
+        """The time series of replica i as a data frame"""
+        return pd.DataFrame(np.asarray(self.cube[i]), columns=self.columns)
+
+
+    def turtles(self, i):
+        """The parameters of the turtles of replica i as a data frame"""
+        return pd.DataFrame({name: np.asarray(array[i]) for name, array in self.agents.items()})
+
+
+    def average(self):
+        """The average time series of the replicas written, computed a replica at
+        a time (the cube is not loaded in memory).
+
+        """
+        idx   = self.replicas()
+        total = np.zeros(self.cube.shape[1:], dtype=np.float64)
+        for i in idx:
+            total += self.cube[i]
+        return pd.DataFrame(total / max(len(idx), 1), columns=self.columns)
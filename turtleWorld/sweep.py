@@ -0,0 +1,184 @@
+"""
+Parameter sweeps of the turtle models.
+
+A sweep runs ns replicas at each point of a design over the parameters of a
+model and returns one table, indexed by (point, replica), with the parameters of
+the point and a summary of each run (peak of infected, final recovered ...).
+
+The design is a data frame of points (one column per parameter) built by design()
+from the ranges of the parameters: a list of values (levels) or, for the
+space-filling designs, a tuple (lo, hi) for a continuous range, (lo, hi, int)
+for a range of integers:
+
+    design({'r0': [2.5, 3.5], 'ti_dist': ['F', 'E']}, 'grid')        4 points
+    design({'r0': (2.0, 4.0), 'ti': (3.0, 8.0), 'p_dist': ['F', 'S']}, 'lhs', 16)
+    design({'r0': (2.0, 4.0), 'turtles': (5000, 20000, int)}, 'sobol', 32)
+
+All the (point x replica) jobs go to one
+pool of processes, the most expensive first (by default the number of turtles),
+so that the long jobs do not end up alone at the tail of the sweep. The replica
+r of point i has seed spawn_seeds(spawn_seeds(seed, points)[i], ns)[r], that of
+run_ensemble(seed=spawn_seeds(seed, points)[i]): runs cached by either are shared.
+"""
+
+import os
+import time
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from scipy.stats import qmc
+
+from . rng import spawn_seeds, seed_sequence
+from . cache import run_key
+from . ensemble import run_replica, mute_models
+from . utils import PrtLvl, print_level
+
+prtl=PrtLvl.Concise
+
+DESIGNS = ('grid', 'lhs', 'sobol')
+
+
+def python_value(x):
+    """numpy scalars as python ones (picklable, json-able parameters)"""
+    return x.item() if isinstance(x, np.generic) else x
+
+
+def scale(u, values):
+    """Maps the uniform coordinates u in [0, 1) to a range (lo, hi), a range of
+    integers (lo, hi, int) or a list of levels"""
+    if isinstance(values, tuple):
+        lo, hi = values[:2]
+        if values[2:] == (int,):
+            return np.minimum(lo + np.floor(u * (hi - lo + 1)), hi).astype(int)
+        if len(values) != 2:
+            raise ValueError(f'range {values}, expected (lo, hi) or (lo, hi, int)')
+        return lo + u * (hi - lo)
+    levels = list(values)
+    return [levels[i] for i in np.minimum((u * len(levels)).astype(int), len(levels) - 1)]
+
+
+def design(ranges, kind='grid', n=None, seed=None):
+    """Data frame of the points of the design kind (grid, lhs or sobol) over ranges
+    (dict name -> list of levels, (lo, hi) or (lo, hi, int)). The grid takes all
+    the combinations of the levels (a range counts as its two ends); lhs and sobol draw n
+    points (a power of 2 for sobol).
+
+    """
+    names = list(ranges)
+    if kind == 'grid':
+        levels = [list(v[:2]) if isinstance(v, tuple) else list(v) for v in ranges.values()]
+        points = list(itertools.product(*levels))
+        return pd.DataFrame(points, columns=names).rename_axis('point')
+
+    if kind not in DESIGNS:
+        raise ValueError(f'unknown design {kind}, expected one of {DESIGNS}')
+    if n is None:
+        raise ValueError(f'design {kind} needs the number of points n')
+    if kind == 'sobol' and (n < 1 or n & (n - 1)):
+        raise ValueError(f'design sobol needs a power of 2 points, n = {n}')
+
+    rng     = np.random.default_rng(seed_sequence(seed))
+    sampler = (qmc.LatinHypercube(len(names), seed=rng) if kind == 'lhs' else
+               qmc.Sobol(len(names), scramble=True, seed=rng))
+    u       = sampler.random(n)
+    return pd.DataFrame({name: scale(u[:, j], ranges[name])
+                         for j, name in enumerate(names)}).rename_axis('point')
+
+
+def default_cost(params):
+    """Relative cost of a run: the number of turtles"""
+    return params.get('turtles', 1)
+
+
+def summarize(dft):
+    """Summary of the time series of a run (as returned by run_model)"""
+    infected = dft.NumberOfInfected.to_numpy()
+    active   = np.flatnonzero(dft.NumberOfInfected.to_numpy() + dft.NumberOfExposed.to_numpy())
+    return dict(peak_infected     = infected.max(),
+                peak_tick         = dft.index[infected.argmax()],
+                final_recovered   = dft.NumberOfRecovered.iloc[-1],
+                final_susceptible = dft.NumberOfSusceptible.iloc[-1],
+                end_tick          = dft.index[active[-1]] if len(active) else dft.index[0])
+
+
+def run_sweep(factory,
+              points,
+              ns            = 10,
+              steps         = 500,
+              fixed         = None,
+              seed          = None,
+              workers       = None,
+              quiet         = True,
+              cost          = default_cost,
+              summary       = summarize,
+              cache         = None):
+    """Runs ns replicas of factory(seed=..., **fixed, **point) (see
+    ensemble.run_ensemble) at each point (row) of the data frame points, for steps.
+
+    Returns a data frame indexed by (point, replica) with the parameters of the
+    point and summary(dft) of the run. cost(params) orders the jobs (the most
+    expensive first). With a cache (cache.RunCache) and a seed, the runs found in
+    the cache are not run again.
+
+    """
+    fixed   = {} if fixed is None else fixed
+    workers = os.cpu_count() if workers is None else workers
+    seeds   = [spawn_seeds(s, ns) for s in spawn_seeds(seed, len(points))]
+    values  = [{k: python_value(v) for k, v in row.items()}
+               for row in points.to_dict('records')]
+    params  = [dict(fixed, **v) for v in values]
+
+    jobs = [(i, r) for i in range(len(params)) for r in range(ns)]
+    jobs.sort(key=lambda job: cost(params[job[0]]), reverse=True)   # stable: replicas in order
+
+    keys = {}
+    if cache is not None and seed is not None:
+        keys = {job: run_key(factory, params[job[0]], steps, seeds[job[0]][job[1]])
+                for job in jobs}
+
+    rows = {}
+    def completed(job, dft):
+        rows[job] = dict(values[job[0]], **summary(dft))
+
+    todo = []
+    for job in jobs:
+        hit = cache.get(keys.get(job)) if keys else None
+        if hit is None:
+            todo.append(job)
+        else:
+            completed(job, hit[0])
+
+    if print_level(prtl, PrtLvl.Concise):
+        print(f' Running sweep of {len(params)} points x {ns} replicas of {steps} steps'
+              f' on {workers} workers ({len(jobs) - len(todo)} found in cache)')
+
+    t0 = time.time()
+    def progress(done):
+        if print_level(prtl, PrtLvl.Concise):
+            dt = time.time() - t0
+            print(f' runs done: {len(jobs) - len(todo) + done}/{len(jobs)}, elapsed {dt:.1f} s')
+
+    if workers == 1:
+        results = (run_replica(factory, params[i], steps, seeds[i][r], (i, r))
+                   for i, r in todo)
+        for done, (job, dft, stats) in enumerate(results, 1):
+            if job in keys:
+                cache.put(keys[job], dft, stats)
+            completed(job, dft)
+            progress(done)
+    else:
+        initializer = mute_models if quiet else None
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializer) as pool:
+            futures = [pool.submit(run_replica, factory, params[i], steps, seeds[i][r], (i, r))
+                       for i, r in todo]
+            for done, future in enumerate(as_completed(futures), 1):
+                job, dft, stats = future.result()
+                if job in keys:
+                    cache.put(keys[job], dft, stats)
+                completed(job, dft)
+                progress(done)
+
+    index = pd.MultiIndex.from_tuples(sorted(rows), names=['point', 'replica'])
+    return pd.DataFrame([rows[job] for job in index], index=index)
@@ -1,3 +1,6 @@
+from . utils import SUSCEPTIBLE, EXPOSED, INFECTED, RECOVERED, KINDS
+
+
 
 def number_turtles_in_cell(cell):
     turtles = [obj for obj in cell if isinstance(obj, SeirTurtle)]
@@ -11,24 +14,30 @@ def turtles_in_cell(cell):
         return False
 
 
+def count_states(agents):
+    """Number of agents in each state (list indexed by state code), from a full scan"""
+    counts = [0] * len(KINDS)
+    for agent in agents:
+        counts[agent.state] += 1
+    return counts
+
+
+# The reporters read the counters kept by the model (see BarrioTortugaBase)
+
 def number_of_infected(model):
-    a =[agent for agent in model.schedule.agents if agent.kind=='I']
-    return len(a)
+    return model.counts[INFECTED]
 
 
 def number_of_susceptible(model):
-    a =[agent for agent in model.schedule.agents if agent.kind=='S']
-    return len(a)
+    return model.counts[SUSCEPTIBLE]
 
 
 def number_of_recovered(model):
-    a =[agent for agent in model.schedule.agents if agent.kind=='R']
-    return len(a)
+    return model.counts[RECOVERED]
 
 
 def number_of_exposed(model):
-    a =[agent for agent in model.schedule.agents if agent.kind=='E']
-    return len(a)
+    return model.counts[EXPOSED]
 
 
 def number_of_turtles_in_neighborhood(model):
@@ -5,6 +5,9 @@ import glob
 import os
 import sys
 
+from . rng import default_stream
+from . store import EnsembleStore, is_store
+
 
 class PrtLvl(Enum):
     Mute     = 1
@@ -13,6 +16,14 @@ class PrtLvl(Enum):
     Verbose  = 4
 
 
+# integer codes of the state (kind) of a SEIR turtle
+SUSCEPTIBLE = 0
+EXPOSED     = 1
+INFECTED    = 2
+RECOVERED   = 3
+KINDS       = 'SEIR'   # letter of each code: KINDS[INFECTED] == 'I'
+
+
 def in_range(x, xmin, xmax):
     if x >= xmin and x < xmax:
         return True
@@ -27,15 +38,28 @@ def print_level(prtl, PRT):
         return False
 
 
-def throw_dice(dice):
-    atry =  np.random.random_sample()
-    if atry < dice:
-        return True
-    else:
-        return False
+def throw_dice(dice, stream=None):
+    """True with probability dice, drawn from stream (a rng.RandomStream, e.g,
+    model.stream, or RandomStream(make_generator(seed))). The default stream, used
+    if stream is None, is not seeded: its draws are not reproducible.
+
+    """
+    return (default_stream if stream is None else stream).throw_dice(dice)
+
+def fill_to_steps(df, steps, every=1):
+    """Extends to the ticks 0, every, 2 every ... up to steps (the collection grid,
+    steps + 1 rows for every = 1) the data frame of a run that stopped early,
+    repeating its last (absorbing) state. A last row off the grid (the state at the
+    end of the run, see ArrayCollector.collect_last) fills the ticks after it.
+
+    """
+    return df.reindex(range(0, steps + 1, every), method='ffill').astype(df.dtypes)
+
 
 def get_files(path, mdir, sep=' '):
     mpath = os.path.join(path, mdir)
+    if is_store(mpath):
+        return get_store(mpath)
     FLS = glob.glob(mpath+"/*.csv", recursive=False)
     FND = {}   # file name dict
     DFD = {}
@@ -49,6 +73,20 @@ def get_files(path, mdir, sep=' '):
     return DFD, FND
 
 
+def get_store(mpath):
+    """get_files for a columnar store (see store.EnsembleStore): the same keys
+    (DFT_run_i, DFT_run_average, STA), read from the memory maps.
+
+    """
+    ens = EnsembleStore(mpath)
+    DFD = {f'DFT_run_{i}': ens.replica(i) for i in ens.replicas()}
+    DFD['DFT_run_average'] = ens.average()
+    if ens.agents:
+        DFD['STA'] = ens.turtles(ens.replicas()[0])
+    FND = {key: mpath for key in DFD}
+    return DFD, FND
+
+
 # def get_files(path, F=True, S=False):
 #     def get_file_type(f):
 #         fl = f.split('_')